@@ -0,0 +1,159 @@
+'''Time the hot paths of orangery on synthetic surveys of increasing size.
+
+Each stage is timed on every combination of the numbers of cross-sections and points per section,
+taking the best of several repeats. The scaling exponent of each stage is the slope of log time
+against log number of points, 1 for a stage that scales linearly.
+
+Examples:
+python benchmarks/bench.py --sections 10 --sections 40 --sections 160 -o bench.csv
+python benchmarks/bench.py --sections 10 --sections 40 --sections 160 --baseline bench.csv
+'''
+
+import os
+import sys
+import time
+import tempfile
+import itertools
+
+import click
+import numpy as np
+import pandas as pnd
+
+import orangery as o
+import orangery.ops.geometry as og
+import orangery.ops.text as ot
+from orangery.cli import defaults
+from orangery.tools import synthetic
+
+
+def best(func, repeat):
+    """Return the shortest of several timings of a function call, in seconds."""
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def stages(file1, file2, dirname):
+    """Prepare the inputs of each stage once, and return the stage names and the calls to time."""
+    codes = defaults.codes
+    s1 = o.Survey(file1, synthetic.COLUMNS, codes)
+    s2 = o.Survey(file2, synthetic.COLUMNS, codes)
+    names = o.shared_groups(s1, s2)
+
+    records = [(s1.group(name), s2.group(name)) for name in names]
+    ends = [o.endpoints(pts1) for pts1, pts2 in records]
+    sections = [(o.Section(pts1, p1, p2), o.Section(pts2, p1, p2)) for (pts1, pts2), (p1, p2) in zip(records, ends)]
+    changes = [o.Change(xs1, xs2, close_ends=True) for xs1, xs2 in sections]
+    outname = os.path.join(dirname, 'change.csv')
+
+    return [
+        ('load', lambda: o.Survey(file1, synthetic.COLUMNS, codes)),
+        ('parse', lambda: ot.parse(s1.data, codes)),
+        ('group', lambda: [s1.group(name) for name in names]),
+        ('project_points', lambda: [og.project_points(pts1, p1, p2) for (pts1, pts2), (p1, p2) in zip(records, ends)]),
+        ('difference', lambda: [og.difference(xs1.line, xs2.line, close_ends=True) for xs1, xs2 in sections]),
+        ('difference_numpy', lambda: [og.difference(xs1.line, xs2.line, close_ends=True, engine='numpy') for xs1, xs2 in sections]),
+        ('change_save', lambda: [chg.save(outname) for chg in changes]),
+    ]
+
+
+def run(sections, points, repeat=3, **kwargs):
+    """Time every stage on synthetic surveys of each size.
+
+    Parameters:
+        sections (list) : numbers of cross-sections.
+        points (list) : numbers of points per cross-section.
+        repeat (int) : number of times to time each stage, the best is kept.
+        kwargs (dict) : keyword arguments passed to synthetic.surveys.
+
+    Returns:
+        results (DataFrame) : seconds per stage and size, with the total number of points and microseconds per point.
+
+    """
+    rows = []
+    with tempfile.TemporaryDirectory() as dirname:
+        for n_sections, n_points in itertools.product(sections, points):
+            file1, file2 = synthetic.write(dirname, sections=n_sections, points=n_points, **kwargs)
+            for stage, func in stages(file1, file2, dirname):
+                seconds = best(func, repeat)
+                rows.append((stage, n_sections, n_points, n_sections * n_points, seconds))
+                click.echo('{0:>16} {1:>6} x {2:<6} {3:10.4f} s'.format(stage, n_sections, n_points, seconds), err=True)
+
+    results = pnd.DataFrame(rows, columns=['stage', 'sections', 'points', 'n', 'seconds'])
+    results['us_per_point'] = 1e6 * results['seconds'] / results['n']
+    return results
+
+
+def scaling(results):
+    """Fit the exponent of the growth of the time of each stage with the total number of points.
+
+    Parameters:
+        results (DataFrame) : as returned by run.
+
+    Returns:
+        exponents (Series) : slope of log seconds against log points by stage, NaN with fewer than two sizes.
+
+    """
+    def slope(df):
+        if df['n'].nunique() < 2:
+            return np.nan
+        return np.polyfit(np.log(df['n']), np.log(df['seconds']), 1)[0]
+
+    exponents = pnd.Series({stage: slope(df) for stage, df in results.groupby('stage', sort=False)}, name='exponent')
+    return exponents
+
+
+def regressions(results, baseline, tolerance):
+    """Compare timings with a baseline run.
+
+    Parameters:
+        results (DataFrame) : as returned by run.
+        baseline (DataFrame) : an earlier result of run.
+        tolerance (float) : ratio of the time to the baseline time above which a stage has regressed.
+
+    Returns:
+        slower (DataFrame) : the stages and sizes that regressed, with the ratio of their times.
+
+    """
+    merged = results.merge(baseline, on=['stage', 'sections', 'points'], suffixes=('', '_baseline'))
+    merged['ratio'] = merged['seconds'] / merged['seconds_baseline']
+    slower = merged.loc[merged['ratio'] > tolerance, ['stage', 'sections', 'points', 'seconds', 'seconds_baseline', 'ratio']]
+    return slower
+
+
+@click.command()
+@click.option('--sections', 'sections', type=click.IntRange(min=1), multiple=True, default=[10, 40, 160], show_default=True, help="Number of cross-sections, may be repeated")
+@click.option('--points', 'points', type=click.IntRange(min=3), multiple=True, default=[50], show_default=True, help="Number of points per cross-section, may be repeated")
+@click.option('--codes', 'codes', type=click.FloatRange(min=0), default=1.0, show_default=True, help="Mean number of descriptive codes per point")
+@click.option('--crossings', 'crossings', type=click.IntRange(min=0), default=2, show_default=True, help="Number of times the profiles of each cross-section cross")
+@click.option('--doubleback', 'doubleback', type=click.FloatRange(0, 1), default=0.0, show_default=True, help="Fraction of cross-sections whose profiles double back")
+@click.option('--repeat', 'repeat', type=click.IntRange(min=1), default=3, show_default=True, help="Number of timings of each stage, the best is kept")
+@click.option('-o', '--output', 'output', type=click.Path(dir_okay=False), metavar='<file>', help="CSV file to save the timings to")
+@click.option('--baseline', 'baseline', type=click.Path(exists=True, dir_okay=False), metavar='<file>', help="CSV file of earlier timings to compare with")
+@click.option('--tolerance', 'tolerance', type=click.FloatRange(min=1), default=1.5, show_default=True, help="Ratio to the baseline time above which a stage has regressed")
+def bench(sections, points, codes, crossings, doubleback, repeat, output, baseline, tolerance):
+    """Time the hot paths of orangery on synthetic surveys."""
+    results = run(sections, points, repeat=repeat, codes=codes, crossings=crossings, doubleback=doubleback)
+
+    table = results.pivot_table(index='stage', columns=['sections', 'points'], values='us_per_point', sort=False)
+    table['exponent'] = scaling(results)
+    click.echo('Microseconds per point, and the scaling exponent of each stage')
+    click.echo(table.round(3).to_string())
+
+    if output:
+        results.to_csv(output, index=False)
+        click.echo('Timings saved to: {0}'.format(output))
+
+    if baseline:
+        slower = regressions(results, pnd.read_csv(baseline), tolerance)
+        if len(slower) > 0:
+            click.echo(slower.round(4).to_string(index=False))
+            raise click.ClickException('{0} timings regressed by more than {1}x'.format(len(slower), tolerance))
+        click.echo('No timings regressed by more than {0}x'.format(tolerance))
+
+
+if __name__ == '__main__':
+    sys.exit(bench())
@@ -1,5 +1,24 @@
-from orangery.core.api import *
+import importlib
 
 from ._version import __version__
 
 __author__ = "Mike Rahnis"
+
+# the api is imported on first use, so that importing the package does not import pandas and shapely
+__all__ = [
+    'Survey', 'Section', 'Change',
+    'pointname', 'excluded', 'group', 'endpoints', 'controls', 'benchmarks',
+    'shared_groups', 'changes', 'tabulate', 'adjust_surveys',
+]
+
+
+def __getattr__(name):
+    if name in __all__:
+        value = getattr(importlib.import_module('orangery.core.api'), name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
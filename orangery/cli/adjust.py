@@ -7,12 +7,11 @@ import logging
 import click
 
 import xml.etree.ElementTree as xml
+import csv
 import json
-import matplotlib.pyplot as plt
+import collections
 
-import opusxml
 import orangery as o
-from orangery.ops.correction import get_offsets
 
 
 def _default_outname(filename: str) -> str:
@@ -34,7 +33,8 @@ def _default_outname(filename: str) -> str:
 @click.option('--keep-header', 'header', is_flag=True, default=True, help="Keeps the original header")
 @click.option('--drop-header', 'header', is_flag=True, help="Drops the original header")
 @click.option('-v', '--verbose', is_flag=True, help='Enables verbose mode')
-def adjust(opusfile, filename, codes, fields, output, point, unit, system, header, verbose):
+@click.pass_obj
+def adjust(obj, opusfile, filename, codes, fields, output, point, unit, system, header, verbose):
     """A command-line utility to adjust a survey dataset.
 
     It translates coordinates by the offset between one coordinate in the dataset and coordinates in an OPUS XML file.
@@ -52,8 +52,11 @@ def adjust(opusfile, filename, codes, fields, output, point, unit, system, heade
     logging.basicConfig(stream=sys.stderr, level=loglevel or logging.INFO)
     logger = logging.getLogger('translate')
 
+    import opusxml
+    from orangery.ops.correction import get_offsets
+
     codes = json.load(open(codes, 'r'))
-    s = o.Survey(filename, fields, codes, 0)
+    s = o.Survey(filename, fields, codes, 0, cache=obj.get('cache'))
 
     record = o.pointname(s.data, point)
 
@@ -64,4 +67,85 @@ def adjust(opusfile, filename, codes, fields, output, point, unit, system, heade
     logger.info('Translating data by offsets between {0} and {1}\n'.format(point, os.path.basename(opusfile)))
 
     s.translate(offsets)
-    s.save(_default_outname(filename), original_header=header)
\ No newline at end of file
+    s.save(_default_outname(filename), original_header=header)
+
+
+@click.command(options_metavar='<options>')
+@click.argument('manifest', nargs=1, type=click.Path(exists=True, dir_okay=False), metavar='<manifest>') # help="CSV file with survey, opus and point columns"
+@click.argument('codes', nargs=1, type=click.Path(exists=True), metavar='<codes_file>') # help="JSON file containing a list of survey codes"
+@click.argument('fields', nargs=1, metavar='<fields>') # help="Character string identifying the columns"
+@click.option('-d', '--output-dir', 'output_dir', type=click.Path(file_okay=False), default='.', metavar='<dir>', help="Directory to write the corrected files to")
+@click.option('-u', '--unit', metavar='<unit>', type=click.Choice(['m','sft']), default='m', help="Distance units")
+@click.option('-s', '--system', metavar='<plane_system>', type=click.Choice(['UTM','SPC']), default='SPC', help="Plane coordinate spec type")
+@click.option('--keep-header/--drop-header', 'header', default=True, help="Keeps or drops the original header")
+@click.option('-j', '--jobs', 'jobs', type=click.IntRange(min=1), default=1, metavar='<jobs>', help="Number of worker processes")
+@click.option('-v', '--verbose', is_flag=True, help='Enables verbose mode')
+@click.pass_obj
+def adjust_batch(obj, manifest, codes, fields, output_dir, unit, system, header, jobs, verbose):
+    """Adjust many survey files listed in a manifest.
+
+    \b
+    The manifest is a CSV file with a header and the columns:
+    survey : survey file to adjust
+    opus : OPUS XML file containing the corrected coordinates of the base point
+    point : name of the base or reference point in the survey
+    Relative paths are taken from the directory of the manifest.
+    Surveys that would be written to the same output file are refused.
+
+    Each OPUS file is read once, and the surveys are adjusted by a pool of worker processes
+    with each corrected file written as soon as it is ready.
+
+    \b
+    Example:
+    adjust-batch season.csv json/codebook.json pyxzctr -u sft -j 4 -d corrected
+
+    """
+    if verbose is True:
+        loglevel = 2
+    else:
+        loglevel = 0
+
+    logging.basicConfig(stream=sys.stderr, level=loglevel or logging.INFO)
+    logger = logging.getLogger('translate')
+
+    import opusxml
+
+    codebook = json.load(open(codes, 'r'))
+
+    root = os.path.dirname(os.path.abspath(manifest))
+    with open(manifest, newline='') as src:
+        rows = list(csv.DictReader(src))
+
+    solutions = {}
+    tasks = []
+    for row in rows:
+        filename = os.path.join(root, row['survey'])
+        opusfile = os.path.join(root, row['opus'])
+        if opusfile not in solutions:
+            solution = opusxml.Solution(opusfile)
+            solutions[opusfile] = [c.magnitude for c in solution.plane_coords(system=system, unit=unit)]
+        outname = os.path.join(output_dir, _default_outname(filename))
+        tasks.append((filename, row['point'], solutions[opusfile], outname))
+
+    outnames = collections.defaultdict(list)
+    for filename, _, _, outname in tasks:
+        outnames[os.path.normcase(os.path.abspath(outname))].append(filename)
+    clashes = [filenames for filenames in outnames.values() if len(filenames) > 1]
+    if clashes:
+        raise click.UsageError('Surveys would be written to the same output file: {0}'.format(
+            '; '.join(', '.join(filenames) for filenames in clashes)))
+
+    os.makedirs(output_dir, exist_ok=True)
+    logger.info('Adjusting {0} surveys with {1} OPUS solutions\n'.format(len(tasks), len(solutions)))
+
+    failed = 0
+    results = o.adjust_surveys(tasks, fields, codebook, original_header=header, cache=obj.get('cache'), jobs=jobs)
+    for (filename, offsets), task in zip(results, tasks):
+        if offsets is None:
+            failed += 1
+            click.echo('{0}: skipped'.format(filename))
+        else:
+            click.echo('{0} -> {1}: {2[0]:.3f}, {2[1]:.3f}, {2[2]:.3f}'.format(filename, task[3], offsets))
+
+    if failed:
+        raise click.ClickException('{0} of {1} surveys could not be adjusted'.format(failed, len(tasks)))
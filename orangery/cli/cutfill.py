@@ -7,19 +7,22 @@ import time
 
 import json
 import click
-import matplotlib
-import matplotlib.pyplot as plt
 
 import orangery as o
+import orangery.tools.timing as timing
 from orangery.cli import defaults, util
-from orangery.tools.plotting import get_scale_factor
 
 
 @click.command(options_metavar='<options>')
 @click.argument('file1', nargs=1, type=click.Path(exists=True), metavar='<file_t0>') # help="survey representing the initial condition"
 @click.argument('file2', nargs=1, type=click.Path(exists=True), metavar='<file_t1>') # help="survey representing the final condition"
 @click.argument('fields', nargs=1, metavar='<fields>') # help="character string identifying the columns"
-@click.argument('xs_name', nargs=1, metavar='<name>') # help="name of the cross-section to plot"
+@click.argument('xs_name', nargs=1, required=False, metavar='<name>') # help="name of the cross-section to plot"
+@click.option('--all', 'all_sections', is_flag=True, help="Calculate cut and fill for every cross-section shared by both surveys")
+@click.option('--match', 'pattern', nargs=1, metavar='<pattern>', help="Calculate cut and fill for every shared cross-section with a name matching a wildcard pattern, e.g. 'XS-*'")
+@click.option('-j', '--jobs', nargs=1, type=click.IntRange(min=1), default=1, metavar='<int>', help="Number of worker processes for --all and --match")
+@click.option('-o', '--output', nargs=1, type=click.Path(), metavar='<outfile>', help="Output csv file for --all and --match; default is cutfill-<t0>-<t1>.csv")
+@click.option('--render', 'render', nargs=1, type=click.Path(), metavar='<path>', help="With --all or --match, also plot every cross-section into a multipage PDF if <path> ends in .pdf, otherwise into PNG files in the directory <path>")
 @click.option('--codes', 'codes_f', nargs=1, type=click.Path(exists=True), metavar='<codes_file>', help="JSON file representing the usage intent of a set of survey codes")
 @click.option('--show/--save', is_flag=True, default=True, help="Show the plot or save to files; --show is the default")
 @click.option('--summary/--no-summary', default=True, help="Print summary information; --summary is the default")
@@ -32,7 +35,8 @@ from orangery.tools.plotting import get_scale_factor
 @click.option('--exclude', nargs=2, type=click.Tuple([str, click.Choice(['t0','t1','tx'])]), multiple=True, metavar='<str choice>', help="Exclude a survey code from a line or lines of section (t0=initial, t1=final, tx=both)")
 @click.option('--overlay', nargs=1, type=click.Path(exists=True))
 @click.option('-v', '--verbose', is_flag=True, help="Enables verbose mode")
-def cutfill(file1, file2, fields, xs_name, codes_f, show, summary, units, labels, exaggeration, scale, close, reverse, exclude, overlay, verbose):
+@click.pass_obj
+def cutfill(obj, file1, file2, fields, xs_name, all_sections, pattern, jobs, output, render, codes_f, show, summary, units, labels, exaggeration, scale, close, reverse, exclude, overlay, verbose):
     """Displays a plot of a repeat survey with cut and fill.
 
     \b
@@ -46,9 +50,17 @@ def cutfill(file1, file2, fields, xs_name, codes_f, show, summary, units, labels
     With the --save option the plot will be saved as an image along with a csv file containing
     data about cross-sectional cut-and-fill areas along the line of secion.
 
+    With the --all or --match options <name> is omitted and both surveys are read once to
+    calculate cut and fill for every cross-section they share. The per-polygon areas and
+    per-section summaries are saved together in one csv file. With --render the plots of
+    the cross-sections are drawn in the same run, without opening a window, one page each
+    into a multipage PDF or one PNG file each into a directory.
+
     \b
     Example:
     orangery cutfill file_2004.csv file_2010.csv pxyzctr XS-7 --reverse t0
+    orangery cutfill file_2004.csv file_2010.csv pxyzctr --match 'XS-*' -o reach.csv
+    orangery cutfill file_2004.csv file_2010.csv pxyzctr --all --render reach.pdf
 
     """
     if verbose is True:
@@ -58,6 +70,14 @@ def cutfill(file1, file2, fields, xs_name, codes_f, show, summary, units, labels
 
     logging.basicConfig(stream=sys.stderr, level=loglevel or logging.INFO)
 
+    batch = all_sections or pattern is not None
+    if batch and xs_name:
+        raise click.UsageError('<name> cannot be combined with --all or --match')
+    if not batch and not xs_name:
+        raise click.UsageError('Missing argument <name>, or use --all or --match')
+    if render and not batch:
+        raise click.UsageError('--render requires --all or --match')
+
     # load the configuration
     codes = defaults.codes.copy()
     if codes_f:
@@ -65,11 +85,11 @@ def cutfill(file1, file2, fields, xs_name, codes_f, show, summary, units, labels
         codes.update(user_codes)
 
     # load the survey data
-    s1 = o.Survey(file1, fields, codes, 0)
-    s2 = o.Survey(file2, fields, codes, 0)
+    s1 = o.Survey(file1, fields, codes, 0, cache=obj.get('cache'), lean=obj.get('lean', False))
+    s2 = o.Survey(file2, fields, codes, 0, cache=obj.get('cache'), lean=obj.get('lean', False))
 
     if overlay:
-        s3 = o.Survey(overlay, fields, codes, 0)
+        s3 = o.Survey(overlay, fields, codes, 0, cache=obj.get('cache'), lean=obj.get('lean', False))
 
     exclude_t0 = []
     exclude_t1 = []
@@ -79,11 +99,48 @@ def cutfill(file1, file2, fields, xs_name, codes_f, show, summary, units, labels
         if code[1] in ('t1', 'tx'):
             exclude_t1.append(code[0])
 
+    if batch:
+        names = o.shared_groups(s1, s2, pattern=pattern)
+        results = list(o.changes(s1, s2, names, exclude_t0=exclude_t0, exclude_t1=exclude_t1, reverse=reverse, close_ends=close, jobs=jobs))
+        table = o.tabulate(results)
+
+        if summary:
+            click.echo(table.groupby('section', sort=False)[['length', 'fill', 'cut', 'net']].first().to_string())
+
+        if output is None:
+            if labels:
+                label_t0, label_t1 = labels[0], labels[1]
+            elif 't' in fields and results:
+                label_t0, label_t1 = results[0][1].section1.date, results[0][1].section2.date
+            else:
+                label_t0, label_t1 = 't0', 't1'
+            output = 'cutfill-' + label_t0.replace('-', '') + '-' + label_t1.replace('-', '') + '.csv'
+
+        table.to_csv(output, index=False)
+        click.echo('Data for {0} of {1} cross-sections saved to: {2}'.format(len(results), len(names), output))
+
+        if render:
+            from orangery.tools.plotting import render_pages
+
+            def pages():
+                for name, chg in results:
+                    if labels:
+                        page_labels = [labels[0], labels[1]]
+                    elif 't' in fields:
+                        page_labels = [chg.section1.date or 't0', chg.section2.date or 't1']
+                    else:
+                        page_labels = ['t0', 't1']
+                    yield name, [chg.section1, chg.section2], page_labels, chg
+
+            render_pages(pages(), render, exaggeration=exaggeration, units=units, scale=scale[0], dpi=scale[1])
+            click.echo('Figures for {0} cross-sections saved to: {1}'.format(len(results), render))
+        return
+
     # select a group of points, in this case a cross section
-    xs_pts1 = o.group(s1.data, s1.code_table, group=xs_name, exclude=exclude_t0)
-    xs_pts2 = o.group(s2.data, s2.code_table, group=xs_name, exclude=exclude_t1)
+    xs_pts1 = s1.group(xs_name, exclude=exclude_t0)
+    xs_pts2 = s2.group(xs_name, exclude=exclude_t1)
 
-    # xs_pts_overlay = o.group(s3.data, s3.code_table, group=xs_name)
+    # xs_pts_overlay = s3.group(xs_name)
 
     # get the endpoints of the group
     p1, p2 = o.endpoints(xs_pts1, reverse=reverse in ('t0','tx'))
@@ -99,9 +156,9 @@ def cutfill(file1, file2, fields, xs_name, codes_f, show, summary, units, labels
         label_t1 = labels[1]
         label_overlay = labels[3]
     elif 't' in fields:
-        label_t0 = (xs1.data.iloc[0]['t']).split('T')[0]
-        label_t1 = (xs2.data.iloc[0]['t']).split('T')[0]
-        # label_overlay = (xs_overlay.data.iloc[0]['t']).split('T')[0]
+        label_t0 = xs1.date
+        label_t1 = xs2.date
+        # label_overlay = xs_overlay.date
     else:
         label_t0 = 't0'
         label_t1 = 't1'
@@ -113,6 +170,10 @@ def cutfill(file1, file2, fields, xs_name, codes_f, show, summary, units, labels
     if summary:
         chg.summarize()
 
+    import matplotlib
+    import matplotlib.pyplot as plt
+    from orangery.tools.plotting import get_scale_factor
+
     font = {'family':'normal','weight':'normal','size':16}
     matplotlib.rc('font', **font)
     # plot the change between two cross-sections
@@ -138,14 +199,16 @@ def cutfill(file1, file2, fields, xs_name, codes_f, show, summary, units, labels
     plt.title('Cross-section {0}'.format(xs_name))
 
     if show:
-        plt.show()
+        with timing.stage('render'):
+            plt.show()
     else:
         fname = xs_name + '-' + label_t0.replace('-', '') + '-' + label_t1.replace('-', '')
 
         scale_factor = get_scale_factor(fig, ax, scale[0])
         dims = fig.get_size_inches()
         fig.set_size_inches(dims[0]*scale_factor, dims[1]*scale_factor)
-        fig.savefig(fname+'.png', dpi=scale[1])
+        with timing.stage('render'):
+            fig.savefig(fname+'.png', dpi=scale[1])
         click.echo('Figure saved to: {}'.format(fname+'.png'))
 
         chg.save(fname+'.csv')
@@ -1,7 +1,6 @@
 # consider doing all this with
 # http://geographiclib.sourceforge.net/
 
-from orangery.ops.geodetic import *
 import click
 
 
@@ -13,11 +12,56 @@ import click
 # on command line use -- (double dash) to allow negative numbers
 # geodetic -- 39.99 -76.26 230.92
 
+# in batch mode the first three columns of the input are read as
+# LATITUDE LONGITUDE HAE in degrees and meters when converting to ECEF, or X Y Z when converting to LLA
+# geodetic --input gnss.csv --to ecef -o gnss_ecef.csv
+# cat gnss_ecef.csv | geodetic --input - --to lla --method direct
+
+
+def convert_chunks(chunks, target='ecef', method='bowring'):
+    import numpy as np
+    from orangery.ops.geodetic import lla2ecef_array, ecef2lla_bowring_array, ecef2lla_direct_array
+
+    # convert each chunk of coordinates as it arrives, appending the converted columns
+    for chunk in chunks:
+        a, b, c = (chunk.iloc[:, i].to_numpy(dtype=np.float64) for i in range(3))
+        if target == 'ecef':
+            X,Y,Z = lla2ecef_array(np.radians(b), np.radians(a), c)
+            converted = {'X': X, 'Y': Y, 'Z': Z}
+        else:
+            solve = ecef2lla_bowring_array if method == 'bowring' else ecef2lla_direct_array
+            lon,lat,h = solve(a, b, c)
+            converted = {'lat': lat, 'lon': lon, 'hae': h}
+        collisions = [name for name in converted if name in chunk.columns]
+        if collisions:
+            raise click.UsageError('The input already has columns named {0}, rename them to keep them from being overwritten'.format(', '.join(collisions)))
+        yield chunk.assign(**converted)
+
+
 @click.command()
-@click.argument('lat', nargs=1, type=click.FLOAT, metavar='LATITUDE')
-@click.argument('lon', nargs=1, type=click.FLOAT, metavar='LONGITUDE')
-@click.argument('h', nargs=1, type=click.FLOAT, metavar='HAE')
-def geodetic(lat, lon, h):
+@click.argument('lat', nargs=1, type=click.FLOAT, required=False, metavar='LATITUDE')
+@click.argument('lon', nargs=1, type=click.FLOAT, required=False, metavar='LONGITUDE')
+@click.argument('h', nargs=1, type=click.FLOAT, required=False, metavar='HAE')
+@click.option('-i', '--input', 'input_f', type=click.File('r'), metavar='<file>', help="CSV file of coordinates to convert in batch, - for stdin")
+@click.option('--to', 'target', type=click.Choice(['ecef', 'lla']), default='ecef', show_default=True, help="Coordinates to convert the batch input to")
+@click.option('--method', 'method', type=click.Choice(['bowring', 'direct']), default='bowring', show_default=True, help="Solution used to convert ECEF to LLA")
+@click.option('--no-header', 'no_header', is_flag=True, help="The batch input has no header row")
+@click.option('--chunksize', 'chunksize', type=click.IntRange(min=1), default=100000, show_default=True, help="Number of rows to convert at a time")
+@click.option('-o', '--output', 'output', type=click.File('w'), default='-', metavar='<file>', help="File to write batch results to, default stdout")
+def geodetic(lat, lon, h, input_f, target, method, no_header, chunksize, output):
+    if input_f is not None:
+        import pandas as pnd
+
+        chunks = pnd.read_csv(input_f, header=None if no_header else 0, chunksize=chunksize, float_precision='round_trip')
+        for i, chunk in enumerate(convert_chunks(chunks, target=target, method=method)):
+            chunk.to_csv(output, header=(i == 0 and not no_header), index=False)
+        return
+
+    if lat is None or lon is None or h is None:
+        raise click.UsageError('Give LATITUDE LONGITUDE HAE, or a file of coordinates with --input')
+
+    from orangery.ops.geodetic import radians, lla2ecef, ecef2lla_bowring, ecef2lla_direct
+
     print("INPUT VALUES")
     print("lon {0} lat {1} h {2}".format(lon,lat,h))
     print()
@@ -37,4 +81,4 @@ def geodetic(lat, lon, h):
 
     lon,lat,h = ecef2lla_direct(X, Y, Z)
     print("WGS84 COORDINATES (DIRECT)")
-    print("lon {0} lat {1} h {2}".format(lon,lat,h))
\ No newline at end of file
+    print("lon {0} lat {1} h {2}".format(lon,lat,h))
@@ -20,7 +20,8 @@ from orangery.cli import defaults, util
 @click.option('--names', 'names', nargs=2, type=click.Tuple([str, str]), metavar='<name col>', help="Name of the cross-section; default will return all names beginning with 'XS'")
 @click.option('--codes', 'codes_f', nargs=1, type=click.Path(exists=True), metavar='<codes_file>', help="JSON file representing the usage intent of a set of survey codes")
 @click.option('-v', '--verbose', is_flag=True, help="Enables verbose mode")
-def info(file, fields, names, codes_f, verbose):
+@click.pass_obj
+def info(obj, file, fields, names, codes_f, verbose):
     """Displays information about a survey file or section within a survey file.
 
     \b
@@ -48,9 +49,9 @@ def info(file, fields, names, codes_f, verbose):
         codes.update(user_codes)
 
     # load the survey data
-    s = o.Survey(file, fields, codes, 0)
+    s = o.Survey(file, fields, codes, 0, cache=obj.get('cache'), lean=obj.get('lean', False))
 
-    xs_pts = o.group(s.data, s.code_table, group=names[0])
+    xs_pts = s.group(names[0])
 
     print("Base coordinate")
     print("---------------")
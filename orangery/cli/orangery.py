@@ -1,24 +1,89 @@
 import sys
+import json
 import logging
-from pkg_resources import iter_entry_points
+import traceback
+from functools import lru_cache
+from importlib.metadata import entry_points
 
 import click
-from click_plugins import with_plugins
 
 import orangery
+import orangery.tools.timing as timing
 
 logger = logging.getLogger(__name__)
 
 
-@with_plugins(iter_entry_points('orangery.subcommands'))
+@lru_cache(maxsize=None)
+def subcommands(group: str = 'orangery.subcommands') -> dict:
+    """Return the subcommand entry points registered in a group, by name, without loading them.
+
+    Parameters:
+        group (str) : name of the entry point group.
+
+    Returns:
+        eps (dict) : maps command names to entry points.
+
+    """
+    found = entry_points()
+    # the group keyword and select arrived in Python 3.10, before that entry_points returns a dict of groups
+    found = found.select(group=group) if hasattr(found, 'select') else found.get(group, [])
+    eps = {ep.name: ep for ep in found}
+    return eps
+
+
+def _broken(name: str, message: str) -> click.Command:
+    """Make a stand-in command that reports a subcommand which failed to load."""
+    def callback():
+        raise click.ClickException('Could not load subcommand {0}\n\n{1}'.format(name, message))
+    return click.Command(name, callback=callback, short_help='Warning: could not load subcommand, see: orangery {0} --help'.format(name),
+                         help=message, add_help_option=False)
+
+
+class LazyGroup(click.Group):
+    """A click Group that lists its subcommands from entry points and imports each one only when it is used."""
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(subcommands()))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.commands and cmd_name in subcommands():
+            try:
+                command = subcommands()[cmd_name].load()
+            except Exception:
+                command = _broken(cmd_name, traceback.format_exc())
+            self.add_command(command, cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+
+def _report() -> dict:
+    # stop recording, and combine the stage timings with the object memory when it was tracked
+    result = timing.disable()
+    memory = sys.modules.get('orangery.tools.memory')
+    if memory is not None and memory.enabled():
+        result['objects'] = memory.disable()
+    return result
+
+
 @click.option('-v', '--verbose', default=False, is_flag=True, help="Enables verbose mode")
+@click.option('--cache', 'cache', nargs=1, type=click.Path(file_okay=False), envvar='ORANGERY_CACHE', metavar='<dir>', help="Directory in which to cache parsed survey files; may also be set with ORANGERY_CACHE")
+@click.option('--lean', 'lean', default=False, is_flag=True, help="Read only the columns in the format string, with compact column types")
+@click.option('--profile', 'profile', default=False, is_flag=True, help="Print the wall time and call count of each stage of the run to stderr as JSON")
+@click.option('--memory-report', 'memory_report', default=False, is_flag=True, help="Add the peak memory allocated in each stage and the memory held by surveys, sections and changes to the report; slows the run")
 @click.version_option(version=orangery.__version__, message='%(version)s')
-@click.group()
+@click.group(cls=LazyGroup)
 @click.pass_context
-def cli(ctx, verbose):
+def cli(ctx, verbose, cache, lean, profile, memory_report):
     ctx.obj = {}
     ctx.obj['verbose'] = verbose
+    ctx.obj['cache'] = cache
+    ctx.obj['lean'] = lean
+    if profile or memory_report:
+        timing.enable(memory=memory_report)
+        if memory_report:
+            import orangery.tools.memory as memory
+            memory.enable()
+        ctx.call_on_close(lambda: click.echo(json.dumps(_report(), indent=2), err=True))
     if verbose:
         logging.basicConfig(stream=sys.stderr, level=logging.INFO)
     else:
-        logging.basicConfig(stream=sys.stderr, level=logging.ERROR)
\ No newline at end of file
+        logging.basicConfig(stream=sys.stderr, level=logging.ERROR)
@@ -7,14 +7,10 @@ import time
 
 import json
 import click
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.colors as colors
 
 import orangery as o
+import orangery.tools.timing as timing
 from orangery.cli import defaults, util
-from orangery.tools.plotting import get_scale_factor
 
 
 @click.command(options_metavar='<options>')
@@ -30,7 +26,8 @@ from orangery.tools.plotting import get_scale_factor
 @click.option('--reverse/--no-reverse', is_flag=True, default=False, help="Reverse the line of section")
 @click.option('--exclude', nargs=1, multiple=True, metavar='<str>', help="Exclude a survey code from the section plot")
 @click.option('-v', '--verbose', is_flag=True, help="Enables verbose mode")
-def planview(file1, file2, fields, xs_name, codes_f, show, units, labels, scale, reverse, exclude, verbose):
+@click.pass_obj
+def planview(obj, file1, file2, fields, xs_name, codes_f, show, units, labels, scale, reverse, exclude, verbose):
     """Displays a plan view map.
 
     \b
@@ -54,6 +51,11 @@ def planview(file1, file2, fields, xs_name, codes_f, show, units, labels, scale,
 
     logging.basicConfig(stream=sys.stderr, level=loglevel or logging.INFO)
 
+    import pandas as pd
+    import matplotlib.pyplot as plt
+    import matplotlib.colors as colors
+    from orangery.tools.plotting import get_scale_factor
+
     # load the configuration
     codes = defaults.codes.copy()
     if codes_f:
@@ -61,10 +63,10 @@ def planview(file1, file2, fields, xs_name, codes_f, show, units, labels, scale,
         codes.update(user_codes)
 
     # load the survey data
-    s1 = o.Survey(file1, fields, codes, 0)
+    s1 = o.Survey(file1, fields, codes, 0, cache=obj.get('cache'), lean=obj.get('lean', False))
 
     # select a group of points, in this case a cross section
-    xs_pts1 = o.group(s1.data, s1.code_table, group=xs_name, exclude=exclude)
+    xs_pts1 = s1.group(xs_name, exclude=exclude)
 
     # get the endpoints of the group
     p1, p2 = o.endpoints(xs_pts1, reverse=reverse)
@@ -76,10 +78,10 @@ def planview(file1, file2, fields, xs_name, codes_f, show, units, labels, scale,
     colors1.iloc[xs1.projection[xs1.projection.o.abs() > 1].index] = colors.to_rgb('tab:red')
 
     # load the survey data
-    s2 = o.Survey(file2, fields, codes, 0)
+    s2 = o.Survey(file2, fields, codes, 0, cache=obj.get('cache'), lean=obj.get('lean', False))
 
     # select a group of points, in this case a cross section
-    xs_pts2 = o.group(s2.data, s2.code_table, group=xs_name, exclude=exclude)
+    xs_pts2 = s2.group(xs_name, exclude=exclude)
 
     # make the sections
     xs2 = o.Section(xs_pts2, p1, p2, reverse=reverse)
@@ -91,9 +93,9 @@ def planview(file1, file2, fields, xs_name, codes_f, show, units, labels, scale,
         label_t1 = labels[1]
         label_overlay = labels[3]
     elif 't' in fields:
-        label_t0 = (xs1.data.iloc[0]['t']).split('T')[0]
-        label_t1 = (xs2.data.iloc[0]['t']).split('T')[0]
-        # label_overlay = (xs_overlay.data.iloc[0]['t']).split('T')[0]
+        label_t0 = xs1.date
+        label_t1 = xs2.date
+        # label_overlay = xs_overlay.date
     else:
         label_t0 = 't0'
         label_t1 = 't1'
@@ -118,12 +120,14 @@ def planview(file1, file2, fields, xs_name, codes_f, show, units, labels, scale,
     plt.title('Cross-section {0}'.format(xs_name))
 
     if show:
-        plt.show()
+        with timing.stage('render'):
+            plt.show()
     else:
         fname = xs_name + '-' + label_t0.replace('-', '') + label_t1.replace('-', '')
     
         scale_factor = get_scale_factor(fig, ax, scale[0])
         dims = fig.get_size_inches()
         fig.set_size_inches(dims[0]*scale_factor, dims[1]*scale_factor)
-        fig.savefig(fname+'.png', dpi=scale[1])
+        with timing.stage('render'):
+            fig.savefig(fname+'.png', dpi=scale[1])
         click.echo('Figure saved to: {}'.format(fname+'.png'))
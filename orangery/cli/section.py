@@ -4,20 +4,23 @@
 import sys
 import logging
 import time
+import fnmatch
 
 import json
 import click
-import matplotlib.pyplot as plt
 
 import orangery as o
+import orangery.tools.timing as timing
 from orangery.cli import defaults, util
-from orangery.tools.plotting import get_scale_factor
 
 
 @click.command(options_metavar='<options>')
 @click.argument('file1', nargs=1, type=click.Path(exists=True), metavar='<file_t0>') # help="survey representing the initial condition"
 @click.argument('fields', nargs=1, metavar='<fields>') # help="character string identifying the columns"
-@click.argument('xs_name', nargs=1, metavar='<name>') # help="name of the cross-section to plot"
+@click.argument('xs_name', nargs=1, required=False, metavar='<name>') # help="name of the cross-section to plot"
+@click.option('--all', 'all_sections', is_flag=True, help="Plot every cross-section in the survey, requires --render")
+@click.option('--match', 'pattern', nargs=1, metavar='<pattern>', help="Plot every cross-section with a name matching a wildcard pattern, e.g. 'XS-*', requires --render")
+@click.option('--render', 'render', nargs=1, type=click.Path(), metavar='<path>', help="Plot the cross-sections into a multipage PDF if <path> ends in .pdf, otherwise into PNG files in the directory <path>")
 @click.option('--codes', 'codes_f', nargs=1, type=click.Path(exists=True), metavar='<codes_file>', help="JSON file representing the usage intent of a set of survey codes")
 @click.option('--show/--save', is_flag=True, default=True, help="Show the plot or save to files; --show is the default")
 @click.option('--units', type=click.Choice(['m','sft','ft']), default='m', help="Unit to show in axis labels")
@@ -27,7 +30,8 @@ from orangery.tools.plotting import get_scale_factor
 @click.option('--reverse/--no-reverse', is_flag=True, default=False, help="Reverse the line of section")
 @click.option('--exclude', nargs=1, multiple=True, metavar='<str>', help="Exclude a survey code from the section plot")
 @click.option('-v', '--verbose', is_flag=True, help="Enables verbose mode")
-def section(file1, fields, xs_name, codes_f, show, units, label, exaggeration, scale, reverse, exclude, verbose):
+@click.pass_obj
+def section(obj, file1, fields, xs_name, all_sections, pattern, render, codes_f, show, units, label, exaggeration, scale, reverse, exclude, verbose):
     """Displays a cross-section plot.
 
     \b
@@ -39,9 +43,14 @@ def section(file1, fields, xs_name, codes_f, show, units, label, exaggeration, s
     Options allow to set various properties of the plot. The default is to --show the plot.
     With the --save option the plot will be saved as an image.
 
+    With the --all or --match options <name> is omitted and every matching cross-section is
+    drawn in one run, without opening a window, one page each into the multipage PDF or one
+    PNG file each into the directory given by --render.
+
     \b
     Example:
     orangery section file_2004.csv pxyzctr XS-7 --reverse t0
+    orangery section file_2004.csv pxyzctr --match 'XS-*' --render sections.pdf
 
     """
     if verbose is True:
@@ -51,6 +60,16 @@ def section(file1, fields, xs_name, codes_f, show, units, label, exaggeration, s
 
     logging.basicConfig(stream=sys.stderr, level=loglevel or logging.INFO)
 
+    batch = all_sections or pattern is not None
+    if batch and xs_name:
+        raise click.UsageError('<name> cannot be combined with --all or --match')
+    if batch and not render:
+        raise click.UsageError('--all and --match require --render')
+    if not batch and not xs_name:
+        raise click.UsageError('Missing argument <name>, or use --all or --match')
+    if render and not batch:
+        raise click.UsageError('--render requires --all or --match')
+
     # load the configuration
     codes = defaults.codes.copy()
     if codes_f:
@@ -58,10 +77,32 @@ def section(file1, fields, xs_name, codes_f, show, units, label, exaggeration, s
         codes.update(user_codes)
 
     # load the survey data
-    s1 = o.Survey(file1, fields, codes, 0)
+    s1 = o.Survey(file1, fields, codes, 0, cache=obj.get('cache'), lean=obj.get('lean', False))
+
+    if batch:
+        from orangery.tools.plotting import render_pages
+
+        names = [name for name in s1.groups() if pattern is None or fnmatch.fnmatchcase(name, pattern)]
+        rendered = []
+
+        def pages():
+            for name in names:
+                try:
+                    xs_pts = s1.group(name, exclude=exclude)
+                    xs = o.Section(xs_pts, *o.endpoints(xs_pts, reverse=reverse), reverse=reverse)
+                except Exception:
+                    logging.error('Skipping cross-section {0}'.format(name))
+                    continue
+                page_label = label or (xs.date if 't' in fields else None) or 't0'
+                rendered.append(name)
+                yield name, [xs], [page_label], None
+
+        render_pages(pages(), render, exaggeration=exaggeration, units=units, scale=scale[0], dpi=scale[1])
+        click.echo('Figures for {0} of {1} cross-sections saved to: {2}'.format(len(rendered), len(names), render))
+        return
 
     # select a group of points, in this case a cross section
-    xs_pts1 = o.group(s1.data, s1.code_table, group=xs_name, exclude=exclude)
+    xs_pts1 = s1.group(xs_name, exclude=exclude)
 
     # get the endpoints of the group
     p1, p2 = o.endpoints(xs_pts1, reverse=reverse)
@@ -72,10 +113,13 @@ def section(file1, fields, xs_name, codes_f, show, units, label, exaggeration, s
     if label:
         label = label
     elif 't' in fields:
-        label = (xs1.data.iloc[0]['t']).split('T')[0]
+        label = xs1.date
     else:
         label = 't0'
 
+    import matplotlib.pyplot as plt
+    from orangery.tools.plotting import get_scale_factor
+
     # plot the change between two cross-sections
     fig = plt.figure()
     ax = fig.add_subplot(111)
@@ -88,12 +132,14 @@ def section(file1, fields, xs_name, codes_f, show, units, label, exaggeration, s
     plt.title('Cross-section {0}'.format(xs_name))
 
     if show:
-        plt.show()
+        with timing.stage('render'):
+            plt.show()
     else:
         fname = xs_name + '-' + label.replace('-', '')
     
         scale_factor = get_scale_factor(fig, ax, scale[0])
         dims = fig.get_size_inches()
         fig.set_size_inches(dims[0]*scale_factor, dims[1]*scale_factor)
-        fig.savefig(fname+'.png', dpi=scale[1])
+        with timing.stage('render'):
+            fig.savefig(fname+'.png', dpi=scale[1])
         click.echo('Figure saved to: {}'.format(fname+'.png'))
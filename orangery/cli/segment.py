@@ -4,10 +4,6 @@ import time
 
 import json
 import click
-import pandas as pnd
-import matplotlib.pyplot as plt
-
-import orangery as o
 
 
 @click.command(options_metavar='<options>')
@@ -25,6 +21,8 @@ def segment(areas_f, materials_f):
     orangery segment XS-3-20130514-20170609.csv materials.json
 
     """
+    import pandas as pnd
+
     def __assign_material(p, low, high):
         prompt = 'Enter a material no. for area {0}: '.format(p)
         err = 'Input must be an integer number between {0} and {1}.'.format(low, high)
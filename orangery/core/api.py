@@ -1,3 +1,4 @@
 from orangery.core.survey import Survey, Section
 from orangery.core.change import Change
-from orangery.core.filter import *
\ No newline at end of file
+from orangery.core.filter import *
+from orangery.core.batch import shared_groups, changes, tabulate, adjust_surveys
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import logging
+import fnmatch
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pnd
+from shapely.geometry import Point
+
+from orangery.core.survey import Survey, Section, date_label
+from orangery.core.change import Change
+from orangery.core.filter import endpoints, pointname
+from orangery.ops.correction import get_offsets
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# a cross-section packed for a worker: the x, y, z array and date of each condition, the endpoints of the line of section,
+# whether each condition is reversed, close_ends and the engine
+ChangeTask = Tuple[np.ndarray, Optional[str], np.ndarray, Optional[str], Tuple[float, ...], Tuple[float, ...], bool, bool, bool, str]
+
+# a survey to adjust in a worker: the file, the base point name and its corrected x, y, z, the output file, the columns,
+# the codebook, original_header and the cache directory
+AdjustTask = Tuple[str, str, List[float], str, str, Dict[str, Any], bool, Optional[str]]
+
+
+def shared_groups(survey1: Survey, survey2: Survey, pattern: Union[None, str] = None) -> list[str]:
+    """Return the names of the groups found in both surveys.
+
+    Parameters:
+        survey1 (Survey) : the initial condition.
+        survey2 (Survey) : the final condition.
+        pattern (str) : optional shell-style wildcard pattern the names must match, for example 'XS-*'.
+
+    Returns:
+        names (list) : shared group names in the order they were surveyed in survey1.
+
+    """
+    names = [name for name in survey1.groups() if name in survey2.group_index]
+    if pattern is not None:
+        names = [name for name in names if fnmatch.fnmatchcase(name, pattern)]
+    return names
+
+
+def _pack(records: pnd.DataFrame, reverse: bool) -> tuple[np.ndarray, Union[None, str]]:
+    """Reduce the records of a section to a contiguous x, y, z array and the date the section will carry."""
+    xyz = np.ascontiguousarray(records[['x','y','z']].to_numpy(dtype=np.float64))
+    date = None
+    if 't' in records.columns and len(records) > 0:
+        date = date_label(records.iloc[-1 if reverse else 0]['t'])
+    return xyz, date
+
+
+def _section(xyz: np.ndarray, date: Union[None, str], p1: Point, p2: Point, reverse: bool) -> Section:
+    """Rebuild a Section from a packed x, y, z array."""
+    records = pnd.DataFrame(xyz, columns=['x','y','z'])
+    xs = Section(records, p1, p2, reverse=reverse)
+    xs.date = date
+    return xs
+
+
+def _change(task: Union[None, ChangeTask]) -> tuple[Union[None, Change], Union[None, str]]:
+    """Build the Sections and Change for one packed cross-section, for use in a worker process.
+
+    Returns the Change and None, or None and the error that prevented it, since exceptions raised in a worker are not logged in the parent.
+    """
+    if task is None:
+        return None, None
+    xyz1, date1, xyz2, date2, p1, p2, reverse1, reverse2, close_ends, engine = task
+    try:
+        p1, p2 = Point(p1), Point(p2)
+        xs1 = _section(xyz1, date1, p1, p2, reverse1)
+        xs2 = _section(xyz2, date2, p1, p2, reverse2)
+        chg = Change(xs1, xs2, close_ends=close_ends, engine=engine)
+    except Exception as exc:
+        return None, repr(exc)
+    return chg, None
+
+
+def changes(
+    survey1: Survey,
+    survey2: Survey,
+    names: list[str],
+    exclude_t0: list[str] = [],
+    exclude_t1: list[str] = [],
+    reverse: Union[None, str] = None,
+    close_ends: bool = False,
+    jobs: int = 1,
+    engine: str = 'shapely'
+) -> Iterator[tuple[str, Change]]:
+    """Calculate the change between two surveys for each of several cross-sections.
+
+    The line of section for each cross-section is taken from the endpoints of its records in survey1.
+    Cross-sections that fail are logged and skipped.
+
+    With more than one job the Sections and Changes are built in a pool of worker processes.
+    Each cross-section is sent to the workers as contiguous x, y, z arrays, so the Sections
+    returned carry only the x, y and z columns of the survey records. Results are yielded
+    in the order of names regardless of the number of jobs.
+
+    Parameters:
+        survey1 (Survey) : the initial condition.
+        survey2 (Survey) : the final condition.
+        names (list) : names of the cross-sections.
+        exclude_t0 (list) : survey codes to exclude from the initial condition.
+        exclude_t1 (list) : survey codes to exclude from the final condition.
+        reverse (str) : reverse a line or lines of section, one of 't0', 't1' or 'tx' for both.
+        close_ends (bool) : True indicates dangles should be closed with a vertical line.
+        jobs (int) : number of worker processes.
+        engine (str) : 'shapely' or 'numpy', the engine used to calculate cut and fill, see ops.geometry.difference.
+
+    Yields:
+        name, change (str, Change) : the name of a cross-section and the change calculated for it.
+
+    """
+    reverse1 = reverse in ('t0','tx')
+    reverse2 = reverse in ('t1','tx')
+
+    if jobs <= 1:
+        for name in names:
+            try:
+                xs_pts1 = survey1.group(name, exclude=exclude_t0)
+                xs_pts2 = survey2.group(name, exclude=exclude_t1)
+
+                p1, p2 = endpoints(xs_pts1, reverse=reverse1)
+
+                xs1 = Section(xs_pts1, p1, p2, reverse=reverse1)
+                xs2 = Section(xs_pts2, p1, p2, reverse=reverse2)
+
+                chg = Change(xs1, xs2, close_ends=close_ends, engine=engine)
+            except Exception as exc:
+                logger.error('Skipping cross-section {0}: {1!r}'.format(name, exc))
+                continue
+            yield name, chg
+        return
+
+    # errors met while packing a cross-section in this process, by name
+    errors: dict[str, str] = {}
+
+    def tasks() -> Iterator[Union[None, ChangeTask]]:
+        for name in names:
+            try:
+                xs_pts1 = survey1.group(name, exclude=exclude_t0)
+                xs_pts2 = survey2.group(name, exclude=exclude_t1)
+                p1, p2 = (tuple(float(c) for c in p.coords[0]) for p in endpoints(xs_pts1, reverse=reverse1))
+                xyz1, date1 = _pack(xs_pts1, reverse1)
+                xyz2, date2 = _pack(xs_pts2, reverse2)
+            except Exception as exc:
+                errors[name] = repr(exc)
+                yield None
+                continue
+            yield xyz1, date1, xyz2, date2, p1, p2, reverse1, reverse2, close_ends, engine
+
+    # executor.map submits every task before it yields the first result, so a cross-section that failed to pack
+    # has its error recorded by the time its result is reached
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for name, (result, error) in zip(names, executor.map(_change, tasks(), chunksize=max(1, len(names) // (4 * jobs)))):
+            if result is None:
+                logger.error('Skipping cross-section {0}: {1}'.format(name, error or errors.get(name)))
+                continue
+            yield name, result
+
+
+def tabulate(results: Iterator[tuple[str, Change]]) -> pnd.DataFrame:
+    """Combine the per-polygon areas and per-section summaries of several changes into one table.
+
+    Parameters:
+        results (iterable) : name and Change pairs, as yielded by changes.
+
+    Returns:
+        result (DataFrame) : one row per polygon with the section name, the section summary, and the polygon interval and area.
+            Sections without polygons have a single row with the polygon fields left empty.
+
+    """
+    summaries = []
+    tables = []
+    for name, chg in results:
+        summaries.append(dict(section=name, **chg.summary()))
+        table = chg.table().rename_axis('polygon').reset_index()
+        table.insert(0, 'section', name)
+        tables.append(table)
+
+    summary_df = pnd.DataFrame(summaries, columns=['section', 'length', 'fill', 'cut', 'net'])
+    if tables:
+        table_df = pnd.concat(tables, ignore_index=True)
+    else:
+        table_df = pnd.DataFrame(columns=['section', 'polygon', 'x0', 'x1', 'area'])
+
+    result = summary_df.merge(table_df, on='section', how='left')
+    return result
+
+
+def _adjust(task: AdjustTask) -> tuple[Union[None, list[float]], Union[None, str]]:
+    """Translate one survey file by the offsets to its base point and save it, for use in a worker process.
+
+    Returns the offsets and None, or None and the reason the survey was skipped.
+    """
+    filename, point, coords, outname, columns, codebook, original_header, cache = task
+    try:
+        s = Survey(filename, columns, codebook, 0, cache=cache)
+        record = pointname(s.data, point)
+        offsets = get_offsets(record, coords) if len(record) == 1 else None
+        if offsets is None:
+            return None, 'found {0} records of point {1}, expected 1'.format(len(record), point)
+        s.translate(offsets)
+        s.save(outname, original_header=original_header)
+    except Exception as exc:
+        return None, repr(exc)
+    return offsets, None
+
+
+def adjust_surveys(
+    tasks: list[tuple[str, str, list[float], str]],
+    columns: str,
+    codebook: dict[str, Any],
+    original_header: bool = False,
+    cache: Union[None, str] = None,
+    jobs: int = 1
+) -> Iterator[tuple[str, Union[None, list[float]]]]:
+    """Translate each of several survey files by the offsets between a named point and its corrected coordinates.
+
+    Each corrected survey is written as soon as it is adjusted. Surveys that fail, or in which the named point
+    is not found exactly once, are logged and skipped. Results are yielded in the order of tasks regardless of
+    the number of jobs.
+
+    Parameters:
+        tasks (list) : the survey file, the name of its base point, the corrected x, y, z of the base point and the output file for each survey.
+        columns (str) : a string of characters that describes the survey data, see Survey.
+        codebook (dict) : a dict that describes the codes used in the survey.
+        original_header (bool) : save the surveys with their original column names.
+        cache (str) : directory in which to cache parsed survey files.
+        jobs (int) : number of worker processes.
+
+    Yields:
+        filename, offsets (str, list) : the survey file and the x, y, z offsets applied to it, None if it was skipped.
+
+    """
+    packed: list[AdjustTask] = [(filename, point, [float(c) for c in coords], outname, columns, codebook, original_header, cache)
+              for filename, point, coords, outname in tasks]
+
+    if jobs <= 1:
+        for task in packed:
+            offsets, error = _adjust(task)
+            if offsets is None:
+                logger.error('Skipping survey {0}: {1}'.format(task[0], error))
+            yield task[0], offsets
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for task, (offsets, error) in zip(packed, executor.map(_adjust, packed)):
+            if offsets is None:
+                logger.error('Skipping survey {0}: {1}'.format(task[0], error))
+            yield task[0], offsets
@@ -7,6 +7,9 @@ from shapely.geometry import LineString
 
 import orangery.ops.geometry as og
 import orangery.tools.plotting as _gfx
+import orangery.tools.timing as timing
+import orangery.tools.memory as memory
+from orangery.core.survey import Section
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
@@ -19,27 +22,61 @@ class Change:
         section1 (Section) : the initial condition.
         section2 (Section) : the final condition.
         close_ends (bool) : True indicates dangles should be closed with a vertical line.
+        engine (str) : 'shapely' or 'numpy', the engine used to calculate cut and fill, see ops.geometry.difference.
 
     """
-    def __init__(self, section1, section2, close_ends=False):
+    @timing.timed('change')
+    def __init__(self, section1: Section, section2: Section, close_ends: bool = False, engine: str = 'shapely') -> None:
         self.section1 = section1
         self.section2 = section2
 
         try:
-            self.intersections, self.polygons, self.cutfill = og.difference(self.section1.line, self.section2.line, close_ends=close_ends)
+            self.intersections, self.polygons, self.cutfill = og.difference(self.section1.line, self.section2.line, close_ends=close_ends, engine=engine)
         except:
             logger.error('Error calculating cut and fill')
             raise
 
+        memory.track(self)
+
+    def memory_usage(self) -> dict:
+        """Return the memory held by the change, not counting its sections.
+
+        Returns:
+            usage (dict) : estimated size in bytes of the intersections and polygons, see tools.memory.geometry_bytes, and the deep size of the areas.
+
+        """
+        usage = {
+            'intersections': memory.geometry_bytes(self.intersections),
+            'polygons': memory.geometry_bytes(self.polygons),
+            'cutfill': memory.frame_bytes(self.cutfill),
+        }
+        return usage
+
     def summarize(self):
         """Prints summary information
 
         """
+        summary = self.summary()
         print('\n')
-        print("Length: ", self.length())
-        print("Fill: ", self.cutfill[self.cutfill > 0].sum())
-        print("Cut:  ", self.cutfill[self.cutfill < 0].sum())
-        print("Net:  ", self.cutfill.sum())
+        print("Length: ", summary['length'])
+        print("Fill: ", summary['fill'])
+        print("Cut:  ", summary['cut'])
+        print("Net:  ", summary['net'])
+
+    def summary(self) -> dict:
+        """Return summary information
+
+        Returns:
+            summary (dict) : length of overlap, total fill, total cut and net change in area.
+
+        """
+        summary = {
+            'length': self.length(),
+            'fill': self.cutfill[self.cutfill > 0].sum(),
+            'cut': self.cutfill[self.cutfill < 0].sum(),
+            'net': self.cutfill.sum(),
+        }
+        return summary
 
     def length(self):
         """Return the length of overlap in two sections on which cut and fill was calculated
@@ -53,11 +90,12 @@ class Change:
 
         return result
 
-    def save(self, filename):
-        """Save polygon cut-fill areas to csv file
+    def table(self) -> pnd.DataFrame:
+        """Return polygon cut-fill areas with the interval along the section
+
+        Returns:
+            result (DataFrame) : interval start x0, interval end x1 and area of each polygon.
 
-        Parameters
-            filename (str) : file to output
         """
         line = LineString((self.intersections).geoms)
         xs, _ = zip(*list(line.coords))
@@ -65,6 +103,16 @@ class Change:
         interval_df = pnd.DataFrame(list(intervals), columns=['x0', 'x1'])
         result = interval_df.join(self.cutfill)
 
+        return result
+
+    def save(self, filename):
+        """Save polygon cut-fill areas to csv file
+
+        Parameters
+            filename (str) : file to output
+        """
+        result = self.table()
+
         result.to_csv(filename, header=True)
 
 
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import numpy as np
 import pandas as pnd
 from shapely.geometry import Point
 
+import orangery.ops.text as ot
+import orangery.tools.timing as timing
+
 
 def pointname(df: pnd.DataFrame, name: str) -> pnd.DataFrame:
     """Given a DataFrame return the named point or survey record.
@@ -20,6 +24,38 @@ def pointname(df: pnd.DataFrame, name: str) -> pnd.DataFrame:
     return result
 
 
+def excluded(codes: pnd.Series, exclude: list) -> np.ndarray:
+    """Given a column of survey codes return a mask of the records carrying any of the excluded codes.
+
+    Parameters:
+        codes (Series) : space-delimited survey codes, missing codes never match.
+        exclude (list) : codes to match.
+
+    Returns:
+        mask (bool ndarray) : True for records having one or more of the excluded codes.
+
+    """
+    if len(exclude) == 0 or len(codes) == 0:
+        return np.zeros(len(codes), dtype=bool)
+
+    if isinstance(codes.dtype, pnd.CategoricalDtype):
+        # look up the categories holding the excluded codes in the token table shared by the survey column
+        positions = ot.category_tokens(codes.dtype)[3]
+        hits = [positions[code] for code in exclude if code in positions]
+        if len(hits) == 0:
+            return np.zeros(len(codes), dtype=bool)
+        # missing codes have category -1 and never match
+        mask = np.isin(codes.cat.codes.to_numpy(), np.concatenate(hits))
+        return mask
+
+    rows, labels, uniques = ot.tokenize(codes)
+    matched = np.isin(uniques, list(exclude))[labels]
+    mask = np.bincount(rows[matched], minlength=len(codes)) > 0
+    mask &= codes.notna().to_numpy()
+    return mask
+
+
+@timing.timed('group')
 def group(df: pnd.DataFrame, code_table: pnd.DataFrame, group: str, exclude: list = []) -> pnd.DataFrame:
     """Given a DataFrame return a copy of the survey records belonging to a given group
 
@@ -27,27 +63,17 @@ def group(df: pnd.DataFrame, code_table: pnd.DataFrame, group: str, exclude: lis
         df (DataFrame) : survey data records.
         code_table (DataFrame) : survey data record properties extracted by parse function.
         group (str) : name of the group to select.
+        exclude (list) : survey codes to exclude from the group.
 
     Returns:
         result (DataFrame) : records matching the given group name.
 
     """
-    recs = df.loc[code_table['group'] == group]
-
-    def match(codes, exclude):
-        # it is possible for nan to show up and as a float you can't split it like a string
-        # this should be addressed by importing the column as string
-        try:
-            codeset = set(codes.split(' '))
-        except:
-            codeset = set()
-        matches = codeset.intersection(exclude)
-        return matches
-
-    mask = recs['c'].apply(lambda x: bool(match(x, set(exclude))))
-    masked = recs[~mask]
-
-    result = df.take(masked.index).copy()
+    positions = np.flatnonzero((code_table['group'] == group).to_numpy(dtype=bool))
+    codes = df['c'].iloc[positions]
+    positions = positions[~excluded(codes, exclude)]
+
+    result = df.take(positions)
     return result
 
 
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import os
 import logging
 import collections
-from typing import Union
+from typing import Iterator, Union
 
+import numpy as np
 import pandas as pnd
 from shapely.geometry import Point, LineString
 from matplotlib.lines import Line2D
@@ -11,11 +13,67 @@ from matplotlib.lines import Line2D
 import orangery.ops.text as ot
 import orangery.ops.geometry as og
 import orangery.ops.correction as oc
+import orangery.ops.store as store
+import orangery.ops.ingest as ingest
+import orangery.tools.timing as timing
+import orangery.tools.memory as memory
+from orangery.core.filter import excluded
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
 
+def column_format(columns: str, names: list) -> collections.OrderedDict:
+    """Map the characters of a format string to the column names of a survey file.
+
+    Parameters:
+        columns (str) : a string of characters that describes the survey data, see Survey.
+        names (list) : the column names in the survey file.
+
+    Returns:
+        format (OrderedDict) : maps internal column names to the column names in the file.
+
+    """
+    known_columns = set(('p','x','y','z','n','e','s','o','z','t','d','c','r','q','f','a'))
+    columns_tmp = list(columns.lower())
+    #columns = columns.lower()
+
+    if set(columns_tmp).issubset(known_columns) == False:
+        unrecognized = set(columns_tmp).difference(known_columns)
+        logger.warning('Unrecognized column entry: {0}'.format(unrecognized))
+
+    columns_tmp = [c.replace('a', 'a'+str(i)) for i, c in enumerate(columns)]
+
+    if len(set(columns_tmp)) < len(columns_tmp):
+        duplicates = [i for i, c in collections.Counter(columns).items() if c > 1]
+        logger.warning('Duplicate columns: {0}'.format(duplicates))
+
+    columns_tmp = [c.replace('n', 'y') for c in columns]
+    columns_tmp = [c.replace('e', 'x') for c in columns]
+    columns_tmp = [c.replace('h', 'z') for c in columns]
+    columns_tmp = [c.replace('s', 'd') for c in columns]
+
+    format = collections.OrderedDict(zip(columns_tmp, names))
+    return format
+
+
+def date_label(timestamp) -> Union[None, str]:
+    """Return the date part of a survey timestamp.
+
+    Parameters:
+        timestamp (str or datetime) : an ISO 8601 timestamp string, or a parsed timestamp.
+
+    Returns:
+        date (str) : the date as YYYY-MM-DD, or None if the timestamp is missing.
+
+    """
+    if isinstance(timestamp, str):
+        return timestamp.split('T')[0]
+    if pnd.isna(timestamp):
+        return None
+    return pnd.Timestamp(timestamp).strftime('%Y-%m-%d')
+
+
 class Survey:
     """ A Survey dataset.
 
@@ -38,44 +96,59 @@ class Survey:
             Examples: 'pyxzctnff', 'pnezfrf'
         codebook (dict) : a dict that describes the codes used in the survey.
         header (int) : the row number of the header. As in pandas it is 0 by default. If there is no header row specify 'None'.
+        cache (str) : optional directory in which to cache the parsed survey. A cached survey is reused while the file,
+            the format string, the codebook and the read options are unchanged, skipping CSV and code parsing. Requires pyarrow.
+        lean (bool) : read only the columns in the format string, with compact types and the fastest available CSV engine.
+            Point names are read as strings, codes and group names as categories and timestamps as datetime64.
+            The bytes used and saved are kept in ingest_report, which is restored with the survey from the cache.
         kwargs (dict) : keyword arguments passed to pandas.read_csv.
 
     """
+    @timing.timed('survey')
     def __init__(
         self,
         filename: str,
         columns: str,
         codebook: dict,
         header: int = 0,
+        cache: Union[None, str] = None,
+        lean: bool = False,
         **kwargs
     ):
         self.filename = filename
         self.codebook = codebook
+        self.ingest_report = None
+        self.transforms = []
+
+        cached = None
+        if cache is not None:
+            if store.available():
+                key = store.cache_key(filename, columns, codebook, header=header, lean=lean, **kwargs)
+                cached = os.path.join(cache, key + '.arrow')
+            else:
+                logger.warning('pyarrow is not installed, survey will not be cached')
+
+        if cached is not None and os.path.exists(cached):
+            try:
+                self.data, self.code_table, metadata = store.read(cached)
+                self.format = collections.OrderedDict(metadata['format'])
+                self.ingest_report = metadata.get('ingest_report')
+                self.group_index = self.index_groups()
+                logger.info('Loaded {0} from cache: {1}'.format(filename, cached))
+                memory.track(self)
+                return
+            except Exception:
+                logger.warning('Failed to read cached survey, parsing {0}'.format(filename))
 
         try:
-            self.data = pnd.read_csv(filename, header=header, **kwargs)
-
-            known_columns = set(('p','x','y','z','n','e','s','o','z','t','d','c','r','q','f','a'))
-            columns_tmp = list(columns.lower())
-            #columns = columns.lower()
-
-            if set(columns_tmp).issubset(known_columns) == False:
-                unrecognized = set(columns_tmp).difference(known_columns)
-                logger.warning('Unrecognized column entry: {0}'.format(unrecognized))
-
-            columns_tmp = [c.replace('a', 'a'+str(i)) for i, c in enumerate(columns)]
-
-            if len(set(columns_tmp)) < len(columns_tmp):
-                duplicates = [i for i, c in collections.Counter(columns).items() if c > 1]
-                logger.warning('Duplicate columns: {0}'.format(duplicates))
-
-            columns_tmp = [c.replace('n', 'y') for c in columns]
-            columns_tmp = [c.replace('e', 'x') for c in columns]
-            columns_tmp = [c.replace('h', 'z') for c in columns]
-            columns_tmp = [c.replace('s', 'd') for c in columns]
+            with timing.stage('survey.read'):
+                if lean:
+                    self.data, self.ingest_report = ingest.read_csv(filename, columns, codebook, header=header, **kwargs)
+                else:
+                    self.data = pnd.read_csv(filename, header=header, **kwargs)
 
             # get inverse map of the dataframe column names, then rename columns for internal use
-            self.format = collections.OrderedDict(zip(columns_tmp, self.data.columns))
+            self.format = column_format(columns, self.data.columns)
             inv_col_map = {v:k for k, v in self.format.items()}
             self.data.rename(columns=inv_col_map, inplace=True)
         except:
@@ -87,6 +160,141 @@ class Survey:
             logger.error('Failed to parse CSV file: {0}'.format(filename))
             raise
 
+        self.group_index = self.index_groups()
+
+        if cached is not None:
+            try:
+                os.makedirs(cache, exist_ok=True)
+                store.write(cached, self.data, self.code_table, {'format': list(self.format.items()), 'ingest_report': self.ingest_report})
+                logger.info('Cached {0} to: {1}'.format(filename, cached))
+            except Exception:
+                logger.warning('Failed to cache survey: {0}'.format(filename))
+
+        memory.track(self)
+
+    @staticmethod
+    def iter_groups(
+        filename: str,
+        columns: str,
+        codebook: dict,
+        header: int = 0,
+        chunksize: int = 100000,
+        exclude: list = [],
+        **kwargs
+    ) -> Iterator[tuple[str, pnd.DataFrame]]:
+        """Read a survey file in chunks and yield each group as soon as its chain is closed.
+
+        The line start and end commands are followed across chunk boundaries, so memory use is bounded by
+        the chunk size and the largest group rather than by the size of the file. Records outside of chains
+        are discarded. A chain left open at the end of the file, or by an out of order command, is yielded
+        when reading stops. Each chain is yielded separately, even when several chains share a name.
+
+        Parameters:
+            filename (str) : the path to the file to read.
+            columns (str) : a string of characters that describes the survey data, see Survey.
+            codebook (dict) : a dict that describes the codes used in the survey.
+            header (int) : the row number of the header.
+            chunksize (int) : number of records to read at a time.
+            exclude (list) : survey codes to exclude from each group.
+            kwargs (dict) : keyword arguments passed to pandas.read_csv.
+
+        Yields:
+            name, records (str, DataFrame) : the name of a group and its survey records, indexed by record number in the file.
+
+        """
+        def finish(name, parts):
+            records = pnd.concat(parts)
+            return name, records[~excluded(records['c'], exclude)]
+
+        inv_col_map = None
+        name, parts = None, []
+
+        try:
+            reader = pnd.read_csv(filename, header=header, chunksize=chunksize, **kwargs)
+        except:
+            logger.error('Failed to read CSV file: {0}'.format(filename))
+            raise
+
+        with reader:
+            for chunk in reader:
+                if inv_col_map is None:
+                    inv_col_map = {v:k for k, v in column_format(columns, chunk.columns).items()}
+                chunk = chunk.rename(columns=inv_col_map)
+
+                starts, ends = ot.commands(chunk['c'], codebook)
+                inchain, stop, error = ot.chains(starts, ends, building=name is not None)
+
+                # label each record in a chain with the number of chains started before it in this chunk
+                positions = np.flatnonzero(inchain)
+                ids = np.cumsum(starts[:stop])[positions]
+                breaks = np.flatnonzero(np.diff(ids)) + 1
+
+                for segment in np.split(positions, breaks):
+                    if len(segment) == 0:
+                        continue
+                    first, last = segment[0], segment[-1]
+                    if starts[first]:
+                        if parts:
+                            yield finish(name, parts)
+                        name = str(ot.as_text(chunk[codebook['group']['column']].iloc[[first]]).iloc[0])
+                        parts = []
+                    parts.append(chunk.iloc[segment])
+                    if ends[last]:
+                        yield finish(name, parts)
+                        name, parts = None, []
+
+                if error == 'start':
+                    logger.error('Out of order line start command')
+                    break
+                elif error == 'end':
+                    logger.error('Out of order line end command')
+                    break
+
+        if parts:
+            logger.warning('Chain {0} was not closed'.format(name))
+            yield finish(name, parts)
+
+    def index_groups(self) -> dict[str, np.ndarray]:
+        """Index the row positions of each group in the code table.
+
+        Returns:
+            index (dict) : maps each group name to the integer positions of its records, in the order the groups were surveyed.
+
+        """
+        index = self.code_table.groupby('group', sort=False).indices
+        return index
+
+    def groups(self) -> list[str]:
+        """Return the names of the groups in the survey.
+
+        Returns:
+            names (list) : group names in the order they were surveyed.
+
+        """
+        names = list(self.group_index)
+        return names
+
+    @timing.timed('group')
+    def group(self, name: str, exclude: list = []) -> pnd.DataFrame:
+        """Return a copy of the survey records belonging to a given group.
+
+        The records are located through the group index, so the cost depends only on the size of the group.
+
+        Parameters:
+            name (str) : name of the group to select.
+            exclude (list) : survey codes to exclude from the group.
+
+        Returns:
+            result (DataFrame) : records matching the given group name.
+
+        """
+        positions = self.group_index.get(name, np.empty(0, dtype=np.intp))
+        codes = self.data['c'].iloc[positions]
+        positions = positions[~excluded(codes, exclude)]
+
+        result = self.data.take(positions)
+        return result
+
     def translate(self, deltas: list[float]):
         """
         Translate the data by an xyz offset and add a line to history.
@@ -95,15 +303,72 @@ class Survey:
         # add a line to history
         logger.info('Translated data by x,y,z offsets: {0[0]}, {0[1]}, {0[2]}\n'.format(deltas))
 
+    def queue_transform(self, matrix: np.ndarray):
+        """Queue a coordinate transform to be applied by apply_transforms.
+
+        Parameters:
+            matrix (ndarray) : 4 x 4 homogeneous transform, see ops.correction.translation, rotation, scaling and helmert.
+
+        """
+        self.transforms.append(np.asarray(matrix, dtype=np.float64))
+
+    def apply_transforms(self) -> np.ndarray:
+        """Apply the queued transforms to the x,y,z coordinates in a single pass and clear the queue.
+
+        The transforms are composed into one matrix in the order they were queued, and applied to a
+        contiguous N x 3 array of the coordinates as a single matrix product.
+
+        Returns:
+            matrix (ndarray) : the composed 4 x 4 transform that was applied.
+
+        """
+        matrix = oc.compose(*self.transforms)
+        self.transforms = []
+
+        xyz = oc.transform(self.data[['x','y','z']].to_numpy(dtype=np.float64), matrix)
+        for i, c in enumerate(['x','y','z']):
+            self.data[c] = xyz[:, i]
+        # add a line to history
+        logger.info('Transformed data by matrix: {0}\n'.format(matrix.tolist()))
+        return matrix
+
+    def memory_usage(self) -> dict[str, int]:
+        """Return the memory held by the survey.
+
+        Returns:
+            usage (dict) : deep size in bytes of the data, the code table and the group index.
+
+        """
+        usage = {
+            'data': memory.frame_bytes(self.data),
+            'code_table': memory.frame_bytes(self.code_table),
+            'group_index': sum(positions.nbytes for positions in self.group_index.values()),
+        }
+        return usage
+
     def save(
         self,
         filename: Union[None, str] = None,
         original_header: bool = False,
-        write_history: bool = False
+        write_history: bool = False,
+        format: str = 'csv'
     ):
         """
         Save the data to a file
+
+        With format='arrow' the data and code table are saved together in an Arrow IPC file that Survey.open can memory-map.
         """
+        if format == 'arrow':
+            if filename is None:
+                raise ValueError('A filename is required to save a survey with format=\'arrow\'')
+            metadata = {'format': list(self.format.items()), 'filename': str(self.filename), 'codebook': self.codebook,
+                        'ingest_report': self.ingest_report}
+            store.write(filename, self.data, self.code_table, metadata)
+            logger.info('Saved data to: {0}'.format(filename))
+            return
+        elif format != 'csv':
+            raise ValueError('Unrecognized file format: {0}'.format(format))
+
         if original_header==True:
             output = self.data.rename(columns=self.format, inplace=False)
         else:
@@ -112,6 +377,32 @@ class Survey:
         output.to_csv(filename)
         logger.info('Saved data to: {0}'.format(filename))
 
+    @classmethod
+    def open(cls, filename: str, memory_map: bool = True) -> Survey:
+        """Open a Survey saved with format='arrow'.
+
+        The file is memory-mapped by default, so opening is near-instant and numeric columns are read-only views
+        of the file rather than copies in the process heap; worker processes opening the same file share one page-cached copy.
+
+        Parameters:
+            filename (str) : the path to the file to open.
+            memory_map (bool) : map the file into memory rather than reading it.
+
+        Returns:
+            survey (Survey) : the saved survey.
+
+        """
+        survey = cls.__new__(cls)
+        survey.data, survey.code_table, metadata = store.read(filename, memory_map=memory_map)
+        survey.filename = metadata.get('filename', filename)
+        survey.codebook = metadata.get('codebook')
+        survey.format = collections.OrderedDict(metadata['format'])
+        survey.ingest_report = metadata.get('ingest_report')
+        survey.transforms = []
+        survey.group_index = survey.index_groups()
+        memory.track(survey)
+        return survey
+
     def plot(self, **kwargs) -> Line2D:
         """Plot the x, y values of the data.
 
@@ -141,6 +432,7 @@ class Section:
         z_adjustment (float) : adjust the elevation of the data.
 
     """
+    @timing.timed('section')
     def __init__(
         self,
         data: pnd.DataFrame,
@@ -164,8 +456,26 @@ class Section:
 
         self.projection = og.project_points(self.data, self.p1, self.p2)
         self.line = LineString(list(zip(self.projection['d'],self.projection['z'])))
-        self.date = (self.data.iloc[0]['t']).split('T')[0]
+        if 't' in self.data.columns:
+            self.date = date_label(self.data.iloc[0]['t'])
+
+        memory.track(self)
+
+    def memory_usage(self) -> dict[str, int]:
+        """Return the memory held by the section.
 
+        Returns:
+            usage (dict) : deep size in bytes of the data and the projection, and the estimated size of the line, see tools.memory.geometry_bytes.
+
+        """
+        usage = {
+            'data': memory.frame_bytes(self.data),
+            'projection': memory.frame_bytes(self.projection),
+            'line': memory.geometry_bytes(self.line),
+        }
+        return usage
+
+    @timing.timed('plot.section')
     def plot(self, view='section', **kwargs) -> Union[None, Line2D]:
         """Plot the d, z values of the projected data.
 
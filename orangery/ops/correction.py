@@ -1,10 +1,11 @@
-'''Functions to translate coordinates'''
+'''Functions to translate and transform coordinates'''
 
 from __future__ import annotations
 
 import logging
 from typing import Union
 
+import numpy as np
 import pandas as pnd
 
 logger = logging.getLogger(__name__)
@@ -14,14 +15,17 @@ logger.addHandler(logging.NullHandler())
 def get_offsets(df: pnd.DataFrame, coords) -> Union[None, list[float]]:
     """
     Calulate the x,y,z offsets between a dataframe record, and an array of x,y,z coordinates.
+    The coordinates may be floats or quantities with a magnitude.
     """
     if len(df) == 1:
-        offsets = [coords[0].magnitude - df.iloc[0]['x'], coords[1].magnitude - df.iloc[0]['y'], coords[2].magnitude - df.iloc[0]['z']]
+        x, y, z = (getattr(c, 'magnitude', c) for c in coords[:3])
+        offsets = [x - df.iloc[0]['x'], y - df.iloc[0]['y'], z - df.iloc[0]['z']]
         return offsets
     else:
         logger.error('df can have only one record. df has {0} records.'.format(len(df)))
         return None
 
+
 def translate(df: pnd.DataFrame, offsets) -> pnd.DataFrame:
     """
     Translate the x,y,z coordinates for records in a dataframe by an array of offsets.
@@ -30,3 +34,83 @@ def translate(df: pnd.DataFrame, offsets) -> pnd.DataFrame:
     df['y'] = df['y'] + offsets[1]
     df['z'] = df['z'] + offsets[2]
     return df
+
+
+# transforms are 4 x 4 homogeneous matrices acting on column vectors of x, y, z, 1
+
+ARCSECOND = np.pi / (180.0 * 3600.0)
+
+
+def translation(dx: float = 0.0, dy: float = 0.0, dz: float = 0.0) -> np.ndarray:
+    """
+    Return a transform that translates coordinates by x,y,z offsets.
+    """
+    matrix = np.eye(4)
+    matrix[:3, 3] = [dx, dy, dz]
+    return matrix
+
+
+def rotation(angle: float, axis: str = 'z', origin: tuple = (0.0, 0.0, 0.0)) -> np.ndarray:
+    """
+    Return a transform that rotates coordinates counterclockwise by an angle in degrees about an x, y or z axis through an origin.
+    """
+    c, s = np.cos(np.radians(angle)), np.sin(np.radians(angle))
+    i, j = {'x': (1, 2), 'y': (2, 0), 'z': (0, 1)}[axis]
+    matrix = np.eye(4)
+    matrix[i, i], matrix[i, j] = c, -s
+    matrix[j, i], matrix[j, j] = s, c
+    return compose(translation(*np.negative(origin)), matrix, translation(*origin))
+
+
+def scaling(factor: float, origin: tuple = (0.0, 0.0, 0.0)) -> np.ndarray:
+    """
+    Return a transform that scales coordinates by a factor about an origin.
+    """
+    matrix = np.diag([factor, factor, factor, 1.0])
+    return compose(translation(*np.negative(origin)), matrix, translation(*origin))
+
+
+def helmert(
+    tx: float = 0.0, ty: float = 0.0, tz: float = 0.0,
+    rx: float = 0.0, ry: float = 0.0, rz: float = 0.0,
+    ds: float = 0.0,
+    convention: str = 'position'
+) -> np.ndarray:
+    """
+    Return a 7-parameter Helmert transform.
+    Translations are in coordinate units, rotations in arcseconds and the scale difference in parts per million.
+    The rotation matrix is the small angle form of the position vector convention, or of the coordinate frame convention, which rotates the opposite way.
+    """
+    if convention not in ('position', 'frame'):
+        raise ValueError('Unrecognized Helmert convention: {0}'.format(convention))
+    rx, ry, rz = np.multiply([rx, ry, rz], ARCSECOND * (1 if convention == 'position' else -1))
+    matrix = np.eye(4)
+    matrix[:3, :3] = (1.0 + ds * 1e-6) * np.array([
+        [1.0, -rz, ry],
+        [rz, 1.0, -rx],
+        [-ry, rx, 1.0],
+    ])
+    matrix[:3, 3] = [tx, ty, tz]
+    return matrix
+
+
+def compose(*transforms: np.ndarray) -> np.ndarray:
+    """
+    Combine transforms into one that applies them in the order given.
+    """
+    matrix = np.eye(4)
+    for transform in transforms:
+        matrix = transform @ matrix
+    return matrix
+
+
+def transform(xyz: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """
+    Apply a transform to an N x 3 array of x,y,z coordinates as a single matrix product.
+    The product is taken as 3 x 3 by 3 x N, which is much faster than N x 3 by 3 x 3, and the result is returned
+    as an N x 3 view of a 3 x N array, so each of its x, y and z columns is contiguous.
+    """
+    xyz = np.asarray(xyz, dtype=np.float64)
+    result = np.matmul(matrix[:3, :3], xyz.T)
+    result += matrix[:3, 3:]
+    return result.T
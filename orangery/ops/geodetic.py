@@ -2,8 +2,11 @@
 # http://geographiclib.sourceforge.net/
 
 from math import pow, sqrt, cos, sin, atan, radians, degrees, modf
+from typing import NamedTuple, Union
 # from numba import vectorize, float64, jit
 
+import numpy as np
+
 
 def wgs84():
     # calculates the WGS84 ellipsoidal parameters
@@ -90,4 +93,106 @@ def ecef2lla_bowring(X,Y,Z, ellipsoid=wgs84()):
         # φ = atan(Z/(p*(1-ellipsoid[3]**2*N/(N+h))))
         #print("N {0} h {1} φ {2}".format(N, h, φ_current))
 
-    return degrees(ƛ),degrees(φ_current),h
\ No newline at end of file
+    return degrees(ƛ),degrees(φ_current),h
+
+
+# the functions below work on whole numpy arrays of coordinates at once
+# they take an immutable Ellipsoid record, or the dict returned by ellipsoid()
+
+class Ellipsoid(NamedTuple):
+    a: float
+    f: float
+    b: float
+    e1: float
+    e2: float
+
+    @classmethod
+    def from_flattening(cls, a, f):
+        # semi-major axis a in meters and flattening f
+        b = a*(1-f)
+        e1 = sqrt((a**2 - b**2)/a**2)
+        e2 = sqrt((a**2 - b**2)/b**2)
+        return cls(a, f, b, e1, e2)
+
+
+WGS84 = Ellipsoid.from_flattening(6378137.000, 1/298.257223563)
+
+
+def as_ellipsoid(ellipsoid: Union[Ellipsoid, dict]) -> Ellipsoid:
+    if isinstance(ellipsoid, Ellipsoid):
+        return ellipsoid
+    return Ellipsoid(**{k: ellipsoid[k] for k in Ellipsoid._fields})
+
+
+def radius_of_curvature_array(φ, ellipsoid=WGS84):
+    ellipsoid = as_ellipsoid(ellipsoid)
+    N = ellipsoid.a / np.sqrt(1 - ellipsoid.e1**2 * np.sin(φ)**2)
+    return N
+
+
+def lla2ecef_array(ƛ, φ, h, ellipsoid=WGS84):
+    # LLA to ECEF for arrays of longitude and latitude in radians and height above the ellipsoid in meters
+    ellipsoid = as_ellipsoid(ellipsoid)
+    ƛ = np.asarray(ƛ, dtype=np.float64)
+    φ = np.asarray(φ, dtype=np.float64)
+    h = np.asarray(h, dtype=np.float64)
+
+    N = radius_of_curvature_array(φ, ellipsoid)
+    cos_φ = np.cos(φ)
+
+    X = (N + h)*cos_φ*np.cos(ƛ)
+    Y = (N + h)*cos_φ*np.sin(ƛ)
+    Z = ((ellipsoid.b**2/ellipsoid.a**2)*N + h)*np.sin(φ)
+
+    return X,Y,Z
+
+
+def ecef2lla_direct_array(X, Y, Z, ellipsoid=WGS84):
+    # ECEF to LLA by direct solution for arrays of coordinates, returns degrees
+    # arctan2 keeps the longitude in the right quadrant where X is negative
+    ellipsoid = as_ellipsoid(ellipsoid)
+    X = np.asarray(X, dtype=np.float64)
+    Y = np.asarray(Y, dtype=np.float64)
+    Z = np.asarray(Z, dtype=np.float64)
+
+    p = np.hypot(X, Y)
+    θ = np.arctan2(Z*ellipsoid.a, p*ellipsoid.b)
+
+    ƛ = np.arctan2(Y, X)
+    φ = np.arctan2(Z + ellipsoid.e2**2 * ellipsoid.b * np.sin(θ)**3, p - ellipsoid.e1**2 * ellipsoid.a * np.cos(θ)**3)
+
+    N = radius_of_curvature_array(φ, ellipsoid)
+    h = p/np.cos(φ) - N
+
+    return np.degrees(ƛ),np.degrees(φ),h
+
+
+def ecef2lla_bowring_array(X, Y, Z, ellipsoid=WGS84, tolerance=0.00001, max_iterations=20):
+    # ECEF to LLA iterating using method of Bowring for arrays of coordinates, returns degrees
+    # each element stops iterating once its height changes by less than the tolerance
+    ellipsoid = as_ellipsoid(ellipsoid)
+    X, Y, Z = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (X, Y, Z)))
+    shape = X.shape
+    X, Y, Z = X.ravel(), Y.ravel(), Z.ravel()
+
+    ƛ = np.arctan2(Y, X)
+    p = np.hypot(X, Y)
+
+    # initial estimated values
+    φ = np.arctan2(Z, p*(1-ellipsoid.e1**2))
+    N = radius_of_curvature_array(φ, ellipsoid)
+    h = np.zeros(X.shape)
+    φ_current = φ.copy()
+
+    active = np.abs(h - (p/np.cos(φ) - N)) > tolerance
+    for _ in range(max_iterations):
+        if not active.any():
+            break
+        i = active.copy()
+        N = radius_of_curvature_array(φ[i], ellipsoid)
+        h[i] = p[i]/np.cos(φ[i]) - N
+        φ_current[i] = φ[i]
+        φ[i] = np.arctan2(Z[i], p[i]*(1-ellipsoid.e1**2*N/(N+h[i])))
+        active[i] = np.abs(h[i] - (p[i]/np.cos(φ[i]) - N)) > tolerance
+
+    return np.degrees(ƛ).reshape(shape),np.degrees(φ_current).reshape(shape),h.reshape(shape)
@@ -6,11 +6,14 @@ from typing import Union
 import numpy as np
 import pandas as pnd
 from numpy import asarray
-from shapely import box, union, union_all, intersection, intersection_all, get_parts, get_coordinates
+from shapely import box, union, union_all, intersection, intersection_all, get_parts, get_coordinates, linearrings, polygons as make_polygons, point_on_surface, area, line_locate_point, distance, linestrings, points as points_from, node, polygonize as polygonize_many, bounds
 from shapely.validation import make_valid
 from shapely.geometry import Point, LineString, MultiLineString, MultiPoint, Polygon
+from shapely.strtree import STRtree
 from shapely.ops import polygonize, polygonize_full, linemerge, split, snap
 
+import orangery.tools.timing as timing
+
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
@@ -86,26 +89,79 @@ def project(p1: Point, p2: Point, p3: Point) -> dict:
     return result
 
 
-def project_points(points: pnd.DataFrame, p1: Point, p2: Point) -> pnd.DataFrame:
+def project_array(xyz: np.ndarray, p1: Point, p2: Point) -> Union[None, np.ndarray]:
+    """Project an array of coordinates onto a line intersecting Points p1 and p2.
+
+    A vectorized equivalent of project2 that handles every coordinate in one pass,
+    including points at negative distances and the left/right sign of the offset.
+
+    Parameters:
+        xyz (ndarray) : N x 3 array of x, y, z coordinates to project.
+        p1 (Point) : point at zero distance on line between p1 and p2.
+        p2 (Point) : endpoint on line.
+
+    Returns:
+        result (ndarray) : N x 6 array of projected x, y, z, distance along line, offset from line, and fractional distance along line.
+
+    """
+    x_delta = p2.x - p1.x
+    y_delta = p2.y - p1.y
+
+    if x_delta == 0 and y_delta == 0:
+        logger.warning("p1 and p2 cannot be the same point")
+        return None
+
+    xyz = np.asarray(xyz, dtype=np.float64)
+    x, y, z = xyz[:, 0], xyz[:, 1], xyz[:, 2]
+
+    u = ((x - p1.x) * x_delta + (y - p1.y) * y_delta) / (x_delta * x_delta + y_delta * y_delta)
+    px = p1.x + u * x_delta
+    py = p1.y + u * y_delta
+
+    # distance along the line from p1, negative behind p1
+    d = np.sqrt((px - p1.x) * (px - p1.x) + (py - p1.y) * (py - p1.y))
+    d = np.where(u < 0, -d, d)
+
+    # offset distance from the line, negative when the point is left of the line
+    offset = np.sqrt((x - px) * (x - px) + (y - py) * (y - py))
+    left = (p1.y - p2.y) * (x - p2.x) - (p1.x - p2.x) * (y - p2.y) < 0
+    offset = np.where(left, -offset, offset)
+
+    result = np.column_stack((px, py, z, d, offset, u))
+    return result
+
+
+@timing.timed('project_points')
+def project_points(points: pnd.DataFrame, p1: Point, p2: Point, engine: str = 'numpy') -> pnd.DataFrame:
     """Project multiple points onto a line through Points p1, p2.
 
     Parameters:
         points (pandas.DataFrame) : survey data to project.
         p1 (Point) : point at zero distance on line between p1 and p2.
         p2 (Point) : endpoint of line.
+        engine (str) : 'numpy' projects all points at once with project_array, 'shapely' projects each point with project2.
 
     Returns:
         result (DataFrame) : DataFrame of projected points, including x, y, z, distance along line, offset from line, and fractional distance along line.
 
     """
-    ppoints = []
-    for i in points.index:
-        p3 = Point(points.loc[i, 'x'], points.loc[i, 'y'], points.loc[i, 'z'])
-        pt = project2(p1, p2, p3)
-        if pt is not None:
-            ppoints.append((pt['pt'].x, pt['pt'].y, pt['pt'].z, pt['d'], pt['o'], pt['u'])) 
-
-    result = pnd.DataFrame(ppoints, columns=['x','y','z','d','o','u'])
+    columns = ['x','y','z','d','o','u']
+
+    if engine == 'numpy':
+        ppoints = project_array(points[['x','y','z']].to_numpy(dtype=np.float64), p1, p2)
+        if ppoints is None:
+            ppoints = np.empty((0, len(columns)))
+    elif engine == 'shapely':
+        ppoints = []
+        for i in points.index:
+            p3 = Point(points.loc[i, 'x'], points.loc[i, 'y'], points.loc[i, 'z'])
+            pt = project2(p1, p2, p3)
+            if pt is not None:
+                ppoints.append((pt['pt'].x, pt['pt'].y, pt['pt'].z, pt['d'], pt['o'], pt['u']))
+    else:
+        raise ValueError('Unrecognized projection engine: {0}'.format(engine))
+
+    result = pnd.DataFrame(ppoints, columns=columns)
     return result
 
 
@@ -187,20 +243,47 @@ def cut_by_distances(line: LineString, intersections: list[Point]) -> MultiLineS
 
 
 def cut_by_points(line: LineString, intersections: list[Point]) -> MultiLineString:
-    """Cut a line at multiple points by breaking the line and inserting each point. Uses the cut_by_point function.
+    """Cut a line at multiple points by breaking the line and inserting each point.
+
+    All the cut points are located along the line at once and spliced into its coordinates in a single pass.
+    Points farther than 1e-8 from the line, or at its ends, are ignored. A cut at a vertex splits the line there,
+    otherwise the cut point is inserted as a shared vertex of the segments on either side of it.
 
     Parameters:
-        line (LineString) : the line to cut.
+        line (LineString) : a list whose last member is the line to cut.
         intersections (MultiPoint) : a MultiPoint object containing the cut points.
 
     Returns:
         segments (MultiLineString) : contains the line segments.
 
     """
-    for i in list(intersections.geoms):
-        cutline = cut_by_point(line[-1], i)
-        line = line[:-1] + cutline
-    segments = MultiLineString(line)
+    target = line[-1]
+    coords = get_coordinates(target)
+    points = get_coordinates(intersections)
+
+    # distance of each vertex and cut point along the line
+    steps = np.hypot(np.diff(coords[:, 0]), np.diff(coords[:, 1]))
+    vertices = np.concatenate(([0.0], np.cumsum(steps)))
+    geoms = points_from(points)
+    located = line_locate_point(target, geoms)
+    on_line = (located > 0.0) & (located < target.length) & (distance(target, geoms) < 1e-8)
+    located, first = np.unique(located[on_line], return_index=True)
+    points = points[on_line][first]
+
+    # cuts that fall on a vertex reuse it, the others are inserted ahead of the next vertex
+    at = np.clip(np.searchsorted(vertices, located), 1, len(coords) - 1)
+    before = np.all(coords[at - 1] == points, axis=1)
+    at = np.where(before, at - 1, at)
+    inserted = ~(before | np.all(coords[at] == points, axis=1))
+    spliced = np.insert(coords, at[inserted], points[inserted], axis=0)
+    cuts = at + np.cumsum(inserted) - inserted
+
+    bounds = np.concatenate(([0], cuts, [len(spliced) - 1]))
+    counts = np.diff(bounds) + 1
+    rows = np.repeat(bounds[:-1], counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    parts = linestrings(spliced[rows], indices=np.repeat(np.arange(len(counts)), counts))
+
+    segments = MultiLineString(list(line[:-1]) + parts.tolist())
     return segments
 
 
@@ -274,6 +357,66 @@ def sign(polygon: Polygon, line: LineString) -> int:
     return sign
 
 
+def _spans(lines) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Return the start and end x, z of the segments of lines that span an interval of x, and the line each belongs to.
+
+    Vertical segments are dropped, so that a ray cast along one is counted by the half-open spans on either side of it.
+    """
+    coords, index = get_coordinates(np.asarray(lines, dtype=object), return_index=True)
+    keep = (index[:-1] == index[1:]) & (coords[:-1, 0] != coords[1:, 0])
+    xa, za = coords[:-1, 0][keep], coords[:-1, 1][keep]
+    xb, zb = coords[1:, 0][keep], coords[1:, 1][keep]
+    return xa, za, xb, zb, index[:-1][keep]
+
+
+def _crosses(px: np.ndarray, pz: np.ndarray, xa: np.ndarray, za: np.ndarray, xb: np.ndarray, zb: np.ndarray) -> np.ndarray:
+    """Return True where a vertical ray cast upward from px, pz crosses the segment from xa, za to xb, zb.
+
+    Each segment spans the half-open interval of x between its ends, so a ray through a shared vertex crosses
+    one of the two segments meeting there, or neither or both where the line turns back in x.
+    """
+    within = (xa <= px) != (xb <= px)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = za + (px - xa) * (zb - za) / (xb - xa)
+    return within & (z > pz)
+
+
+def signs(polygons: list[Polygon], line: LineString, blocksize: int = 1 << 22) -> np.ndarray:
+    """Classify polygons as lying above or below a line, all at once.
+
+    A representative point inside each polygon is found in one call, and a vertical ray is cast upward from
+    each point against every segment of the line. A point with an even number of crossings lies above the line,
+    an odd number below it, which also holds where the line doubles back on itself.
+
+    Parameters:
+        polygons (Polygon array) : the polygons to classify.
+        line (LineString) : a line representing the initial condition.
+        blocksize (int) : the most point and segment pairs to test at a time.
+
+    Returns:
+        signs (int ndarray) : +1 for polygons above the line, -1 below and 0 where a polygon is empty.
+
+    """
+    points = get_coordinates(point_on_surface(np.asarray(polygons, dtype=object)))
+    xa, za, xb, zb, _ = _spans([line])
+
+    crossings = np.zeros(len(points), dtype=np.int64)
+    step = max(1, blocksize // max(1, len(xa)))
+    for start in range(0, len(points), step):
+        px = points[start:start+step, 0:1]
+        pz = points[start:start+step, 1:2]
+        crossings[start:start+step] = np.count_nonzero(_crosses(px, pz, xa, za, xb, zb), axis=1)
+
+    result = np.where(crossings % 2 == 0, 1, -1)
+    if len(points) < len(polygons):
+        # empty polygons have no representative point
+        empty = np.asarray([p.is_empty for p in polygons])
+        full = np.zeros(len(polygons), dtype=np.int64)
+        full[~empty] = result
+        result = full
+    return result
+
+
 def close(line1: LineString, line2: LineString) -> tuple[LineString, LineString]:
     """Create lines to close left and right cross-section ends
 
@@ -292,13 +435,112 @@ def close(line1: LineString, line2: LineString) -> tuple[LineString, LineString]
     return left_closing, right_closing
 
 
-def difference(line1: LineString, line2: LineString, close_ends: bool = False) -> tuple[list[Point], list[LineString], pnd.Series]:
+def monotonic(coords: np.ndarray) -> Union[None, np.ndarray]:
+    """Return the coordinates of a profile ordered by increasing distance, if distance changes monotonically along it.
+
+    Parameters:
+        coords (ndarray) : N x 2 array of distance, elevation coordinates.
+
+    Returns:
+        result (ndarray) : the coordinates with strictly increasing distance, or None if the profile doubles back or is vertical anywhere.
+
+    """
+    steps = np.diff(coords[:, 0])
+    if np.all(steps > 0):
+        result = coords
+    elif np.all(steps < 0):
+        result = coords[::-1]
+    else:
+        result = None
+    return result
+
+
+def profile_difference(coords1: np.ndarray, coords2: np.ndarray, close_ends: bool = False) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Find the signed areas between two profiles without building polygon topology.
+
+    The breakpoints of both profiles within their overlap are merged, the crossings of the profiles are
+    inserted where the elevation difference changes sign, and the difference is integrated between
+    crossings with the trapezoid rule, which is exact for piecewise linear profiles.
+
+    Parameters:
+        coords1 (ndarray) : N x 2 array of strictly increasing distance and elevation for the initial condition.
+        coords2 (ndarray) : M x 2 array of strictly increasing distance and elevation for the final condition.
+        close_ends (bool) : also count the areas between the outermost crossings and the ends of the overlap.
+
+    Returns:
+        grid (ndarray) : K x 3 array of distance, initial elevation and final elevation over the overlap, including the crossings.
+        edges (ndarray) : indices into grid of the start and end of each area.
+        areas (ndarray) : the area between each pair of edges, positive for fill and negative for cut.
+
+    """
+    lo = max(coords1[0, 0], coords2[0, 0])
+    hi = min(coords1[-1, 0], coords2[-1, 0])
+    if not lo < hi:
+        return np.empty((0, 3)), np.empty(0, dtype=np.int64), np.empty(0)
+
+    x = np.unique(np.concatenate((coords1[:, 0], coords2[:, 0])))
+    x = x[(x >= lo) & (x <= hi)]
+    dz = np.interp(x, coords2[:, 0], coords2[:, 1]) - np.interp(x, coords1[:, 0], coords1[:, 1])
+
+    # insert a vertex wherever the difference changes sign between breakpoints
+    i = np.flatnonzero(dz[:-1] * dz[1:] < 0)
+    xc = x[i] + (x[i+1] - x[i]) * dz[i] / (dz[i] - dz[i+1])
+    x = np.insert(x, i + 1, xc)
+    dz = np.insert(dz, i + 1, 0.0)
+    edges = np.flatnonzero(dz == 0)
+
+    z1 = np.interp(x, coords1[:, 0], coords1[:, 1])
+    z2 = np.interp(x, coords2[:, 0], coords2[:, 1])
+    z2[edges] = z1[edges]
+    grid = np.column_stack((x, z1, z2))
+
+    if close_ends:
+        edges = np.unique(np.concatenate(([0], edges, [len(x) - 1])))
+
+    segments = np.diff(x) * (dz[:-1] + dz[1:]) / 2
+    cumulative = np.concatenate(([0.0], np.cumsum(segments)))
+    magnitude = np.concatenate(([0.0], np.cumsum(np.abs(segments))))
+    areas = cumulative[edges[1:]] - cumulative[edges[:-1]]
+
+    # where the profiles coincide there is no area to enclose
+    keep = magnitude[edges[1:]] - magnitude[edges[:-1]] > 0
+    edges = np.column_stack((edges[:-1], edges[1:]))[keep]
+    return grid, edges, areas[keep]
+
+
+def _difference_numpy(coords1: np.ndarray, coords2: np.ndarray, close_ends: bool = False) -> tuple[MultiPoint, list[Polygon], pnd.Series]:
+    """Build the outputs of difference from profile_difference, in the form the shapely engine returns them."""
+    grid, edges, areas = profile_difference(coords1, coords2, close_ends=close_ends)
+
+    crossings = grid[grid[:, 1] == grid[:, 2]][:, :2]
+    if close_ends and len(grid) > 0:
+        ends = np.column_stack((grid[[0, 0, -1, -1], 0], grid[[0, 0, -1, -1], [1, 2, 1, 2]]))
+        crossings = np.unique(np.concatenate((crossings, ends)), axis=0)
+    intersections = MultiPoint(crossings)
+
+    # each ring runs out along the initial profile and back along the final profile
+    rings = [np.concatenate((grid[a:b+1, [0, 1]], grid[a:b+1, [0, 2]][::-1])) for a, b in edges]
+    if rings:
+        indices = np.repeat(np.arange(len(rings)), [len(r) for r in rings])
+        polygons = make_polygons(linearrings(np.concatenate(rings), indices=indices)).tolist()
+    else:
+        polygons = []
+
+    cutfill = pnd.Series(areas, name='area')
+    return intersections, polygons, cutfill
+
+
+@timing.timed('difference')
+def difference(line1: LineString, line2: LineString, close_ends: bool = False, engine: str = 'shapely') -> tuple[list[Point], list[LineString], pnd.Series]:
     """ Create polygons from two LineString objects.
 
     Parameters:
         line1 (LineString) : a line representing the initial condition.
         line2 (LineString) : a line representing the final condition.
         close_ends (bool) : option to close open line ends with vertical line segments.
+        engine (str) : 'shapely' nodes and polygonizes the lines with GEOS, 'numpy' integrates the elevation difference
+            with profile_difference. The numpy engine needs both lines to change monotonically in distance and falls back
+            to the shapely engine otherwise.
 
     Returns:
         intersections (Point array) : the intersections between the LineString objects.
@@ -306,6 +548,15 @@ def difference(line1: LineString, line2: LineString, close_ends: bool = False) -
         signs (int array) : contains values of +1 or -1 to identify polygons as cut or fill.
 
     """
+    if engine == 'numpy':
+        coords1 = monotonic(get_coordinates(line1))
+        coords2 = monotonic(get_coordinates(line2))
+        if coords1 is not None and coords2 is not None:
+            return _difference_numpy(coords1, coords2, close_ends=close_ends)
+        logger.info('Line doubles back on itself, using the shapely engine')
+    elif engine != 'shapely':
+        raise ValueError('Unrecognized difference engine: {0}'.format(engine))
+
     if close_ends==True:
         # get the left and right bounding lines
         left_close, right_close = close(line1, line2)
@@ -339,38 +590,121 @@ def difference(line1: LineString, line2: LineString, close_ends: bool = False) -
         # the line of section doubles-back on itself zoom in to see
         # pre-sorting the points by distance would fix but may not always desireable?
 
-    areas = []
-    for poly in polygons:
-        s = sign(poly, line1)
-        areas.append(poly.area*s)
+    areas = area(np.asarray(polygons, dtype=object)) * signs(polygons, line1) if polygons else np.empty(0)
 
-    cutfill = pnd.Series(asarray(areas), name='area')
+    cutfill = pnd.Series(asarray(areas, dtype=np.float64), name='area')
 
     return intersections, polygons, cutfill
 
 
-def snap_to_points(segments: MultiLineString, intersections: list[Point]) -> MultiLineString:
+@timing.timed('difference_many')
+def difference_many(
+    lines1: list[LineString],
+    lines2: list[LineString],
+    close_ends: bool = False,
+    names: Union[None, list] = None
+) -> pnd.DataFrame:
+    """Find the cut and fill polygons between many pairs of lines at once.
+
+    Every step runs as a vectorized shapely call over the whole batch: the pairs of lines (and any closing lines)
+    are noded together, polygonized, and each polygon is classified by the parity of the crossings of a vertical
+    ray cast upward from a point inside it against the line of the initial condition, as in signs.
+
+    Parameters:
+        lines1 (LineString array) : lines representing the initial condition of each section.
+        lines2 (LineString array) : lines representing the final condition of each section.
+        close_ends (bool) : option to close open line ends with vertical line segments.
+        names (list) : a name for each section, by default its position in the arrays.
+
+    Returns:
+        result (DataFrame) : one row per polygon with the section, the polygon number within the section counted
+            along the section, the interval x0 to x1 the polygon spans, and the area, positive for fill and negative for cut.
+
+    """
+    lines1 = np.asarray(lines1, dtype=object)
+    lines2 = np.asarray(lines2, dtype=object)
+    if lines1.shape != lines2.shape:
+        raise ValueError('lines1 and lines2 must have the same length')
+    if names is None:
+        names = np.arange(len(lines1))
+    names = np.asarray(names)
+
+    linework = [lines1, lines2]
+    if close_ends:
+        # vertical closing lines at the ends of the overlap of the bounding boxes
+        bounds1, bounds2 = bounds(lines1), bounds(lines2)
+        minx = np.maximum(bounds1[:, 0], bounds2[:, 0])
+        maxx = np.minimum(bounds1[:, 2], bounds2[:, 2])
+        miny = np.minimum(bounds1[:, 1], bounds2[:, 1])
+        maxy = np.maximum(bounds1[:, 3], bounds2[:, 3])
+        for x in (minx, maxx):
+            ends = np.stack((np.column_stack((x, miny)), np.column_stack((x, maxy))), axis=1)
+            linework.append(linestrings(ends))
+
+    noded = node(union_all(np.stack(linework, axis=1), axis=1))
+    polygons, section = get_parts(polygonize_many(noded[:, np.newaxis]), return_index=True)
+
+    # count crossings of line1 above a point inside each polygon, pairing each point with the segments of its own section
+    inside = get_coordinates(point_on_surface(polygons))
+    xa, za, xb, zb, owner = _spans(lines1)
+    first = np.searchsorted(owner, np.arange(len(lines1)), side='left')
+    count = np.searchsorted(owner, np.arange(len(lines1)), side='right') - first
+    pairs = count[section]
+    point = np.repeat(np.arange(len(polygons)), pairs)
+    segment = np.repeat(first[section] - np.cumsum(pairs) + pairs, pairs) + np.arange(pairs.sum())
+    crosses = _crosses(inside[point, 0], inside[point, 1], xa[segment], za[segment], xb[segment], zb[segment])
+    crossings = np.bincount(point[crosses], minlength=len(polygons))
+    areas = area(polygons) * np.where(crossings % 2 == 0, 1, -1)
+
+    extent = bounds(polygons)
+    result = pnd.DataFrame({
+        'section': names[section] if len(section) > 0 else names[:0],
+        'order': section,
+        'x0': extent[:, 0],
+        'x1': extent[:, 2],
+        'area': areas,
+    })
+    result = result.sort_values(['order', 'x0'], kind='stable')
+    result.insert(1, 'polygon', result.groupby('order').cumcount())
+    result = result.drop(columns='order').reset_index(drop=True)
+    return result
+
+
+def snap_to_points(segments: MultiLineString, intersections: list[Point], decimal: int = 8) -> MultiLineString:
     """Snap line segment endpoints to given points
 
     Compare segment endpoints in a MultiLineString against points in a Point array to within a given precision;
     if the points match then update the segment endpoint with the coordinate given in the Point array.
+    Matches are found through a spatial index on the points and the endpoints are written straight into the
+    coordinate array, so the cost grows with the number of segments and points rather than their product.
+    Where an endpoint matches more than one point the last of them is used.
 
     Parameters:
         segments (MultiLineString) : the line segments to snap.
         intersections (Point array) : the points to snap to.
+        decimal (int) : endpoints within 0.5 * 10**-decimal of a point are snapped to it.
 
     Returns:
         newline (MultiLineString) : an updated MultiLineString.
 
     """
-    snapped = []
-    for s, segment in enumerate(segments):
-        coords = list(segment.coords)
-        for i, intersection in enumerate(intersections):
-            if Point(coords[0]).almost_equals(intersection, decimal=8):
-                segment = update(segment, intersection, 0)
-            if Point(coords[-1]).almost_equals(intersection, decimal=8):
-                segment = update(segment, intersection, len(coords)-1)
-        snapped.append(segment)
-    newline = MultiLineString(snapped)
+    parts = get_parts(segments)
+    coords, index = get_coordinates(parts, return_index=True)
+    points = get_coordinates(intersections)
+
+    if len(coords) > 0 and len(points) > 0:
+        starts = np.searchsorted(index, np.arange(len(parts)), side='left')
+        ends = np.searchsorted(index, np.arange(len(parts)), side='right') - 1
+        ends = np.concatenate((starts, ends))
+
+        tree = STRtree(points_from(points))
+        pairs = tree.query(points_from(coords[ends]), predicate='dwithin', distance=0.5 * 10**-decimal)
+
+        # keep the last matching point for each endpoint
+        order = np.lexsort((pairs[1], pairs[0]))
+        endpoint, point = pairs[:, order]
+        last = np.append(endpoint[1:] != endpoint[:-1], True)
+        coords[ends[endpoint[last]]] = points[point[last]]
+
+    newline = MultiLineString(linestrings(coords, indices=index).tolist() if len(coords) > 0 else [])
     return newline
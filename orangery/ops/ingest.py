@@ -0,0 +1,125 @@
+'''Functions to read survey files with compact column types'''
+
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+import pandas as pnd
+
+import orangery.ops.store as store
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# column types by format string character, other columns are left to pandas
+LEAN_DTYPES: dict[str, str] = {
+    'p': 'string',
+    'x': 'float64', 'e': 'float64',
+    'y': 'float64', 'n': 'float64',
+    'z': 'float64', 'h': 'float64',
+    'd': 'float64', 's': 'float64',
+    'o': 'float64',
+    'c': 'category',
+    'r': 'category',
+}
+
+
+def lean_dtypes(columns: str, names: list[str], codebook: dict[str, Any]) -> tuple[dict[str, str], list[str]]:
+    """Choose compact column types for a survey file from its format string.
+
+    Parameters:
+        columns (str) : a string of characters that describes the survey data, see Survey.
+        names (list) : the column names in the survey file.
+        codebook (dict) : a dict that describes the codes used in the survey.
+
+    Returns:
+        dtypes (dict) : maps column names to types.
+        dates (list) : names of the timestamp columns.
+
+    """
+    group_column = codebook.get('group', {}).get('column')
+
+    dtypes: dict[str, str] = {}
+    dates: list[str] = []
+    for c, name in zip(columns.lower(), names):
+        if c == 't':
+            dates.append(name)
+        elif c == group_column:
+            dtypes[name] = 'category'
+        elif c in LEAN_DTYPES:
+            dtypes[name] = LEAN_DTYPES[c]
+    return dtypes, dates
+
+
+def default_bytes(df: pnd.DataFrame) -> int:
+    """Estimate the memory a DataFrame would use had its text and timestamp columns been read with default types.
+
+    Parameters:
+        df (DataFrame) : survey data records.
+
+    Returns:
+        nbytes (int) : estimated bytes.
+
+    """
+    nbytes = int(df.memory_usage(index=True, deep=True).sum())
+    for name, column in df.items():
+        if isinstance(column.dtype, pnd.CategoricalDtype) or pnd.api.types.is_string_dtype(column):
+            default = column.astype(object).astype(str)
+        elif pnd.api.types.is_datetime64_any_dtype(column):
+            default = column.dt.strftime('%Y-%m-%dT%H:%M:%S')
+        else:
+            continue
+        nbytes += int(default.memory_usage(index=False, deep=True)) - int(column.memory_usage(index=False, deep=True))
+    return nbytes
+
+
+def read_csv(filename: str, columns: str, codebook: dict[str, Any], header: int = 0, **kwargs: Any) -> tuple[pnd.DataFrame, dict[str, Any]]:
+    """Read only the columns named in a format string, with compact types.
+
+    Point names get a string type, codes and group names a categorical type, timestamps datetime64 and coordinates float64.
+    The pyarrow CSV engine is used when it is installed and supports the given options.
+
+    Parameters:
+        filename (str) : the path to the file to read.
+        columns (str) : a string of characters that describes the survey data, see Survey.
+        codebook (dict) : a dict that describes the codes used in the survey.
+        header (int) : the row number of the header.
+        kwargs (dict) : keyword arguments passed to pandas.read_csv.
+
+    Returns:
+        data (DataFrame) : survey data records, with the original column names.
+        report (dict) : the engine used, columns read and skipped, bytes used, estimated bytes with default types and bytes saved.
+
+    """
+    names = list(pnd.read_csv(filename, header=header, nrows=0, **kwargs).columns)
+    usecols = names[:len(columns)]
+    dtypes, dates = lean_dtypes(columns, usecols, codebook)
+
+    options: dict[str, Any] = dict(header=header, usecols=usecols, dtype=dtypes, parse_dates=dates)
+    options.update(kwargs)
+
+    engine = kwargs.get('engine', 'pyarrow' if store.available() else 'c')
+    try:
+        data = pnd.read_csv(filename, **dict(options, engine=engine))
+    except ValueError:
+        if engine != 'pyarrow' or 'engine' in kwargs:
+            raise
+        logger.info('Options not supported by the pyarrow engine, reading {0} with the c engine'.format(filename))
+        engine = 'c'
+        data = pnd.read_csv(filename, **dict(options, engine=engine))
+
+    nbytes = int(data.memory_usage(index=True, deep=True).sum())
+    estimate = default_bytes(data)
+    report: dict[str, Any] = {
+        'engine': engine,
+        'columns': len(usecols),
+        'skipped': len(names) - len(usecols),
+        'bytes': nbytes,
+        'default_bytes': estimate,
+        'saved_bytes': estimate - nbytes,
+    }
+    logger.info('Read {0} with {1} engine: {2} bytes, {3} bytes saved over default types, {4} columns skipped'.format(
+        filename, engine, nbytes, estimate - nbytes, report['skipped']))
+
+    return data, report
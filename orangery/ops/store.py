@@ -0,0 +1,157 @@
+'''Functions to store survey data and code tables in Arrow IPC files'''
+
+from __future__ import annotations
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from typing import Any, Union
+
+import pandas as pnd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# bump when the layout of stored files or the output of the code parser changes
+STORE_VERSION = 1
+CODE_TABLE_PREFIX = 'code_table:'
+
+
+def available() -> bool:
+    """Return True if pyarrow is installed."""
+    return pa is not None
+
+
+def _require() -> None:
+    if pa is None:
+        raise ImportError('pyarrow is required to store survey data, install it with: pip install pyarrow')
+
+
+def file_digest(filename: str, blocksize: int = 1 << 20) -> str:
+    """Return a hash of the contents of a file.
+
+    Parameters:
+        filename (str) : path to the file.
+        blocksize (int) : number of bytes to read at a time.
+
+    Returns:
+        digest (str) : hexadecimal digest of the file contents.
+
+    """
+    h = hashlib.blake2b(digest_size=20)
+    with open(filename, 'rb') as src:
+        for block in iter(lambda: src.read(blocksize), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cache_key(filename: str, columns: str, codebook: dict[str, Any], **options: Any) -> str:
+    """Return a key identifying the parsed form of a survey file.
+
+    The key changes when the file contents, the format string, the codebook or any of the read options change.
+
+    Parameters:
+        filename (str) : path to the survey file.
+        columns (str) : the format string describing the survey data.
+        codebook (dict) : a dict that describes the codes used in the survey.
+        options (dict) : any other options that affect how the file is read.
+
+    Returns:
+        key (str) : hexadecimal key.
+
+    """
+    h = hashlib.blake2b(digest_size=20)
+    h.update(file_digest(filename).encode())
+    h.update(columns.encode())
+    h.update(json.dumps(codebook, sort_keys=True, default=str).encode())
+    h.update(json.dumps(options, sort_keys=True, default=str).encode())
+    h.update(str(STORE_VERSION).encode())
+    return h.hexdigest()
+
+
+def write(filename: str, data: pnd.DataFrame, code_table: pnd.DataFrame, metadata: Union[None, dict[str, Any]] = None) -> None:
+    """Write survey data and its code table to an Arrow IPC file.
+
+    The code table columns are stored alongside the data columns under a prefix, padded to the length of the data.
+    The file is written to a temporary name and then moved into place, so readers never see a partial file.
+
+    Parameters:
+        filename (str) : path of the file to write.
+        data (DataFrame) : survey data records.
+        code_table (DataFrame) : survey data record properties extracted by parse function.
+        metadata (dict) : JSON serializable values to store with the file.
+
+    """
+    _require()
+
+    codes = code_table.reset_index(drop=True).reindex(range(len(data)))
+    codes.columns = [CODE_TABLE_PREFIX + c for c in codes.columns]
+    combined = pnd.concat([data.reset_index(drop=True), codes], axis=1)
+
+    table = pa.Table.from_pandas(combined, preserve_index=False)
+    stored = dict(metadata or {})
+    stored['code_table_rows'] = len(code_table)
+    stored['version'] = STORE_VERSION
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b'orangery': json.dumps(stored).encode(),
+    })
+
+    dirname = os.path.dirname(os.path.abspath(filename))
+    fd, tmpname = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+    os.close(fd)
+    try:
+        with pa.OSFile(tmpname, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmpname, filename)
+    except:
+        os.remove(tmpname)
+        raise
+
+
+def read(filename: str, memory_map: bool = False) -> tuple[pnd.DataFrame, pnd.DataFrame, dict[str, Any]]:
+    """Read survey data and its code table from an Arrow IPC file.
+
+    When memory mapped, numeric columns without missing values are not copied into the process heap;
+    the DataFrame columns are read-only views of the mapped file, and processes reading the same file
+    share one page-cached copy of it.
+
+    Parameters:
+        filename (str) : path of the file to read.
+        memory_map (bool) : map the file into memory rather than reading it.
+
+    Returns:
+        data (DataFrame) : survey data records.
+        code_table (DataFrame) : survey data record properties.
+        metadata (dict) : the values stored with the file.
+
+    """
+    _require()
+
+    if memory_map:
+        # the mapping stays open for as long as the tables refer to it
+        table = pa.ipc.open_file(pa.memory_map(filename, 'r')).read_all()
+    else:
+        with pa.OSFile(filename, 'rb') as source:
+            table = pa.ipc.open_file(source).read_all()
+
+    metadata = json.loads(table.schema.metadata[b'orangery'])
+
+    data_columns = [c for c in table.column_names if not c.startswith(CODE_TABLE_PREFIX)]
+    code_columns = [c for c in table.column_names if c.startswith(CODE_TABLE_PREFIX)]
+
+    data = table.select(data_columns).to_pandas(split_blocks=True)
+    codes = table.select(code_columns).slice(0, metadata['code_table_rows'])
+    codes = codes.rename_columns([c[len(CODE_TABLE_PREFIX):] for c in code_columns])
+    code_table = codes.to_pandas(split_blocks=True)
+
+    return data, code_table, metadata
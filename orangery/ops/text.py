@@ -1,15 +1,187 @@
 from __future__ import annotations
 
+import weakref
 import logging
+from typing import Union
+
+import numpy as np
 import pandas as pnd
 
+import orangery.tools.timing as timing
+
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
+# tokens of the categories of each categorical dtype, which the slices of a survey column share
+_category_tables = weakref.WeakKeyDictionary()
+
+
+def as_text(values: pnd.Series) -> pnd.Series:
+    """Convert a column to strings the way str() would, so missing values become 'nan'.
+
+    Parameters:
+        values (Series) : column to convert.
+
+    Returns:
+        result (Series) : column of str values.
+
+    """
+    if pnd.api.types.is_string_dtype(values) and not isinstance(values.dtype, pnd.CategoricalDtype):
+        result = values.fillna('nan')
+    else:
+        result = values.astype(object).where(values.notna(), 'nan').map(str)
+    return result
+
+
+def tokenize(codes: pnd.Series) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Split a column of space-delimited codes into a flat array of factorized tokens.
+
+    Parameters:
+        codes (Series) : column containing the survey codes.
+
+    Returns:
+        rows (ndarray) : the row position of each token.
+        labels (ndarray) : the position of each token in uniques, in the order the tokens appear.
+        uniques (ndarray) : the distinct tokens.
+
+    """
+    if isinstance(codes.dtype, pnd.CategoricalDtype):
+        # expand the tokens of each category to the records
+        cat_rows, cat_labels, uniques, _ = category_tokens(codes.dtype)
+        cat_counts = np.bincount(cat_rows, minlength=len(codes.cat.categories) + 1)
+        cat_offsets = np.cumsum(cat_counts) - cat_counts
+
+        category = codes.cat.codes.to_numpy().astype(np.int64)
+        category[category < 0] = len(cat_counts) - 1
+        counts = cat_counts[category]
+        rows = np.repeat(np.arange(len(codes)), counts)
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        labels = cat_labels[cat_offsets[category][rows] + within]
+        return rows, labels, uniques
+
+    split = as_text(codes).str.split(' ')
+    counts = split.str.len().to_numpy(dtype=np.int64)
+    rows = np.repeat(np.arange(len(split)), counts)
+    labels, uniques = pnd.factorize(split.explode().to_numpy(dtype=object))
+    return rows, labels, np.asarray(uniques, dtype=object)
+
+
+def category_tokens(dtype: pnd.CategoricalDtype) -> tuple[np.ndarray, np.ndarray, np.ndarray, dict[str, np.ndarray]]:
+    """Split the categories of a categorical dtype into tokens, once for each dtype.
+
+    The categories are followed by a missing category, which tokenizes as 'nan', at position len(dtype.categories).
+
+    Parameters:
+        dtype (CategoricalDtype) : the dtype of a column of survey codes.
+
+    Returns:
+        rows (ndarray) : the category position of each token.
+        labels (ndarray) : the position of each token in uniques.
+        uniques (ndarray) : the distinct tokens.
+        positions (dict) : maps each token to the positions of the categories containing it.
+
+    """
+    table = _category_tables.get(dtype)
+    if table is None:
+        categories = pnd.Series(list(dtype.categories) + [np.nan], dtype=object)
+        rows, labels, uniques = tokenize(categories)
+        order = np.argsort(labels, kind='stable')
+        splits = np.cumsum(np.bincount(labels, minlength=len(uniques)))[:-1]
+        positions = dict(zip(uniques, (np.unique(p) for p in np.split(rows[order], splits))))
+        table = rows, labels, uniques, positions
+        _category_tables[dtype] = table
+    return table
+
+
+def compile_codebook(codebook: dict) -> dict:
+    """Precompile the codes sub-dict of a codebook into a lookup of code sets.
+
+    Parameters:
+        codebook (dict) : a dict that describes the codes used in the survey.
+
+    Returns:
+        lookup (dict) : maps each code category to a frozenset of its codes.
+
+    """
+    lookup = {k: frozenset(v) for k, v in codebook['codes'].items()}
+    return lookup
+
+
+def _commands(rows: np.ndarray, labels: np.ndarray, uniques: np.ndarray, n: int, codebook: dict) -> tuple[np.ndarray, np.ndarray]:
+    start, end = codebook['codes']['control'][0], codebook['codes']['control'][1]
+    starts = np.zeros(n, dtype=bool)
+    starts[rows[(uniques == start)[labels]]] = True
+    ends = np.zeros(n, dtype=bool)
+    ends[rows[(uniques == end)[labels]]] = True
+    return starts, ends
+
+
+def commands(codes: pnd.Series, codebook: dict) -> tuple[np.ndarray, np.ndarray]:
+    """Locate the line start and end commands in a column of survey codes.
+
+    Parameters:
+        codes (Series) : column containing the survey codes.
+        codebook (dict) : a dict that describes the codes used in the survey.
+
+    Returns:
+        starts (bool ndarray) : True for records carrying a line start command.
+        ends (bool ndarray) : True for records carrying a line end command.
+
+    """
+    rows, labels, uniques = tokenize(codes)
+    starts, ends = _commands(rows, labels, uniques, len(codes), codebook)
+    return starts, ends
 
+
+def chains(starts: np.ndarray, ends: np.ndarray, building: bool = False) -> tuple[np.ndarray, int, Union[None, str]]:
+    """Derive chain membership from start and end commands as a cumulative state.
+
+    On each record a start command is evaluated before the record is assigned and an end command after it,
+    so records carrying the start and the end command both belong to the chain.
+
+    Parameters:
+        starts (bool ndarray) : True for records carrying a line start command.
+        ends (bool ndarray) : True for records carrying a line end command.
+        building (bool) : True if a chain is open before the first record.
+
+    Returns:
+        inchain (bool ndarray) : True for records that belong to a chain.
+        stop (int) : number of records that are valid before the first out of order command.
+        error (str) : the type of the first out of order command, 'start' or 'end', otherwise None.
+
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+
+    state = np.cumsum(starts - ends) + int(building)
+    before = state - starts + ends
+    during = before + starts
+
+    # the state only leaves 0 and 1 after an out of order command
+    bad_start = (starts == 1) & (before != 0)
+    bad_end = (ends == 1) & (during != 1)
+    bad = np.flatnonzero(bad_start | bad_end)
+
+    stop = len(starts)
+    error = None
+    if len(bad) > 0:
+        first = bad[0]
+        if bad_start[first]:
+            stop, error = first, 'start'
+        else:
+            stop, error = first + 1, 'end'
+
+    inchain = during[:stop] == 1
+    return inchain, stop, error
+
+
+@timing.timed('parse')
 def parse(points: pnd.DataFrame, codebook: dict) -> pnd.DataFrame:
     """Parses the codes in a DataFrame to extract information about points and chains of points.
 
+    The code column is tokenized once, tokens are classified against a compiled codebook lookup,
+    and chain membership is derived from the line start and end commands as a cumulative state.
+
     Parameters:
         points (DataFrame) : contains the survey data.
         codebook (dict) : a dict that describes the codes used in the survey.
@@ -19,45 +191,44 @@ def parse(points: pnd.DataFrame, codebook: dict) -> pnd.DataFrame:
             the added group column currently comes from the 'comment' field at each start command.
 
     """
+    lookup = compile_codebook(codebook)
+    n = len(points)
+
+    rows, labels, uniques = tokenize(points['c'])
+
+    # validate start and end order for chains
+    starts, ends = _commands(rows, labels, uniques, n, codebook)
+    inchain, stop, error = chains(starts, ends)
+    if error == 'start':
+        logger.error('Out of order line start command')
+    elif error == 'end':
+        logger.error('Out of order line end command')
+
+    keep = rows < stop
+    rows, labels = rows[keep], labels[keep]
+
+    # assign codes to the correct column, classifying the distinct tokens only
+    # when a record has more than one code of a kind the last one wins
+    columns = {}
+    for k, v in lookup.items():
+        matched = np.fromiter((token in v for token in uniques), dtype=bool, count=len(uniques))[labels]
+        hits = rows[matched]
+        last = np.append(hits[1:] != hits[:-1], True) if len(hits) > 0 else np.zeros(0, dtype=bool)
+        column = np.full(stop, None, dtype=object)
+        column[hits[last]] = uniques[labels[matched][last]]
+        columns[k] = column
+
+        counts = np.bincount(hits, minlength=stop)
+        for pt in np.flatnonzero(counts > 1):
+            logger.warning('More than one {0} code in point {1}'.format(k, str(points['p'].iloc[pt])))
+
+    # carry the group name forward from each start command while the chain is open
+    opened = np.flatnonzero(starts[:stop])
+    names = pnd.Series(None, index=np.arange(stop), dtype=object)
+    names.iloc[opened] = as_text(points[codebook['group']['column']].iloc[opened]).to_numpy(dtype=object)
+    group = names.ffill().to_numpy(dtype=object, copy=True)
+    group[~inchain] = None
+    columns['group'] = group
 
-    # parse the codes into columns for marker, control, view and breakline
-    results = []
-    build = False
-    group = None
-    for pt in points.index:
-        codes = str(points.loc[pt, 'c']).split(' ')
-
-        # validate start and end order for chains
-        if codebook['codes']['control'][0] in codes:
-            if build == False:
-                build = True
-                group = str(points.loc[pt, codebook['group']['column']])
-            else:
-                logger.error('Out of order line start command')
-                break
-
-        # assign codes to the correct column
-        record = []
-        for k, v in codebook['codes'].items():
-            c = None
-            for code in codes:
-                if code in v:
-                    if c != None:
-                        logger.warning('More than one {0} code in point {1}'.format(k, str(points.loc[pt, 'p'])))
-                    c = code
-            kv = (k, c)
-            record.append(kv)
-        record.append(('group', group))
-        results.append(dict(record))
-
-        # validate start and end order for chains, clean up after line end command
-        if codebook['codes']['control'][1] in codes:
-            if build == True:
-                build = False
-                group = None
-            else:
-                logger.error('Out of order line end command')
-                break
-
-    df = pnd.DataFrame(results)
+    df = pnd.DataFrame(columns)
     return df
@@ -0,0 +1,130 @@
+'''Functions to account for the memory held by surveys, sections and changes'''
+
+from __future__ import annotations
+
+import sys
+import dataclasses
+from typing import Any, Dict, Optional, Protocol, Union
+
+import numpy as np
+import pandas as pnd
+import shapely
+
+
+class Measured(Protocol):
+    """An object that reports the memory it holds, such as a Survey, Section or Change."""
+    def memory_usage(self) -> Dict[str, int]: ...
+
+
+@dataclasses.dataclass
+class _Totals:
+    """Totals of the objects of one type."""
+    count: int = 0
+    total_bytes: int = 0
+    max_bytes: int = 0
+    bytes: Dict[str, int] = dataclasses.field(default_factory=dict)
+
+
+# byte totals by object type while tracking is enabled, otherwise None
+_objects: Optional[Dict[str, _Totals]] = None
+
+
+def frame_bytes(df: Union[None, pnd.DataFrame, pnd.Series]) -> int:
+    """Return the deep size of a DataFrame or Series, including its index and the contents of object columns.
+
+    Parameters:
+        df (DataFrame) : the frame to measure.
+
+    Returns:
+        nbytes (int) : size in bytes, 0 for None.
+
+    """
+    if df is None:
+        return 0
+    nbytes = df.memory_usage(index=True, deep=True)
+    return int(nbytes.sum()) if isinstance(nbytes, pnd.Series) else int(nbytes)
+
+
+def geometry_bytes(geometries: Any) -> int:
+    """Estimate the size of shapely geometries from their coordinates.
+
+    GEOS does not report the memory it holds, so the estimate is the bytes needed to store the coordinates
+    at their coordinate dimension, plus the size of the Python objects.
+
+    Parameters:
+        geometries (geometry or list) : a geometry or a sequence of geometries.
+
+    Returns:
+        nbytes (int) : estimated size in bytes, 0 for None.
+
+    """
+    if geometries is None:
+        return 0
+    geoms = np.array(geometries, dtype=object).ravel()
+    geoms = geoms[~shapely.is_missing(geoms)]
+    if len(geoms) == 0:
+        return 0
+    coordinates = shapely.get_num_coordinates(geoms) * shapely.get_coordinate_dimension(geoms)
+    nbytes = 8 * int(coordinates.sum()) + sum(sys.getsizeof(g) for g in geoms)
+    return nbytes
+
+
+def enable() -> None:
+    """Start tracking the memory of each Survey, Section and Change as it is made, discarding any earlier record."""
+    global _objects
+    _objects = {}
+
+
+def disable() -> Union[None, Dict[str, Any]]:
+    """Stop tracking object memory.
+
+    Returns:
+        result (dict) : the report of the tracking, see report, or None if tracking was not enabled.
+
+    """
+    global _objects
+    result = report()
+    _objects = None
+    return result
+
+
+def enabled() -> bool:
+    """Return True if object memory is being tracked."""
+    return _objects is not None
+
+
+def track(obj: Measured) -> None:
+    """Add the memory of an object to the totals of its type, if tracking is enabled.
+
+    Survey, Section and Change call this as each is made, so it returns at once while tracking is disabled.
+
+    Parameters:
+        obj (object) : an object with a memory_usage method that returns a dict of bytes by part, such as a Survey, Section or Change.
+
+    """
+    if _objects is None:
+        return
+    usage = obj.memory_usage()
+    total = sum(usage.values())
+    totals = _objects.setdefault(type(obj).__name__, _Totals())
+    totals.count += 1
+    totals.total_bytes += total
+    totals.max_bytes = max(totals.max_bytes, total)
+    for part, nbytes in usage.items():
+        totals.bytes[part] = totals.bytes.get(part, 0) + nbytes
+
+
+def report() -> Union[None, Dict[str, Any]]:
+    """Summarize the object memory tracked so far.
+
+    The sizes are taken when each object is made, and count objects that may since have been released.
+
+    Returns:
+        result (dict) : for each object type, the number of objects, their total and largest size, and the total size of each of their parts,
+            or None if tracking is not enabled.
+
+    """
+    if _objects is None:
+        return None
+    result = {kind: dataclasses.asdict(totals) for kind, totals in _objects.items()}
+    return result
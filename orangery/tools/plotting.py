@@ -1,13 +1,44 @@
-import matplotlib.patches as patches
+from __future__ import annotations
 
+import os
+import contextlib
 
+import numpy as np
+import shapely
+from matplotlib.collections import PolyCollection, PathCollection
+from matplotlib.path import Path
+from matplotlib.textpath import TextPath
+from matplotlib.font_manager import FontProperties
+from matplotlib.transforms import Affine2D
+
+import orangery.tools.timing as timing
+
+# line styles of the initial and final condition, as drawn by the section and cutfill subcommands
+SECTION_STYLES = [
+    dict(marker='o', markersize=4, markerfacecolor='white', markeredgecolor='black', linestyle='-', color='gray'),
+    dict(marker='o', markersize=4, markerfacecolor='black', markeredgecolor='black', linestyle='-', color='black'),
+]
+
+
+def _exteriors(polygons) -> tuple[list[np.ndarray], np.ndarray]:
+    """Return the exterior ring coordinates of each part of a sequence of polygons, and the position of the polygon each part came from."""
+    parts, index = shapely.get_parts(np.array(polygons, dtype=object), return_index=True)
+    if len(parts) == 0:
+        return [], index
+    rings = shapely.get_exterior_ring(parts)
+    verts = np.split(shapely.get_coordinates(rings), np.cumsum(shapely.get_num_coordinates(rings))[:-1])
+    return verts, index
+
+
+@timing.timed('plot.polygons')
 def polygon_plot(self, ax=None, fill_ec='black', fill_fc='none', fill_hatch='...', fill_label=None, cut_ec='black', cut_fc='none', cut_hatch='x', cut_label=None):
-    """Adds two groups of polygon patches to a matplotlib Axis.
+    """Adds the fill polygons and the cut polygons to a matplotlib Axis as two PolyCollections.
 
-    Fill and label first polygon of each type separately, otherwise make sequential call to fill.
+    Each collection is a single artist with a single legend entry however many polygons it holds.
+    Every part of a MultiPolygon is drawn.
 
     Parameters:
-        ax (Axis) : matplotlib Axis to which to add polygon patches.
+        ax (Axis) : matplotlib Axis to which to add polygon collections.
         fill_ec (str) :  fill polygon edge color.
         fill_fc (str) :  fill polygon face color.
         fill_hatch (str) : fill polygon hatch pattern.
@@ -21,36 +52,31 @@ def polygon_plot(self, ax=None, fill_ec='black', fill_fc='none', fill_hatch='...
         ax (Axis) : patched matplotlib Axis.
 
     """
-    cuts = []
-    hascut = False
-    fills = []
-    hasfill = False
-    for i, poly in enumerate(self.polygons):
-        # make_valid can return a MultiPolygon which has no exterior property and will fail below
-        x,y = poly.exterior.xy
-        if self.cutfill[i] > 0:
-            if hasfill == True:
-                fills.append(x)
-                fills.append(y)
-            else:
-                ax.fill(x, y, ec=fill_ec, fc=fill_fc, hatch=fill_hatch, label=fill_label)
-                hasfill=True
-        elif self.cutfill[i] < 0:
-            if hascut == True:
-                cuts.append(x)
-                cuts.append(y)
-            else:
-                ax.fill(x, y, ec=cut_ec, fc=cut_fc, hatch=cut_hatch, label=cut_label)
-                hascut=True
-    ax.fill(*cuts, ec=cut_ec, fc=cut_fc, hatch=cut_hatch)
-    ax.fill(*fills, ec=fill_ec, fc=fill_fc, hatch=fill_hatch)
+    verts, index = _exteriors(self.polygons)
+    areas = np.asarray(self.cutfill, dtype=np.float64)[index]
+
+    groups = [
+        (areas > 0, fill_ec, fill_fc, fill_hatch, fill_label),
+        (areas < 0, cut_ec, cut_fc, cut_hatch, cut_label),
+    ]
+    for selected, ec, fc, hatch, label in groups:
+        if not selected.any():
+            continue
+        collection = PolyCollection([verts[i] for i in np.flatnonzero(selected)], edgecolors=ec, facecolors=fc, hatch=hatch, label=label)
+        ax.add_collection(collection)
+    ax.autoscale_view()
 
     return ax
 
 
+@timing.timed('plot.annotations')
 def annotate_plot(self, ax=None):
     """Add annotation to a plot to identify individual polygons.
 
+    A bar along the bottom of the Axis spans each polygon, in colors alternating between red and gray,
+    with the number of the polygon at its midpoint. The bars are drawn as one PolyCollection and the numbers,
+    as glyph outlines sized in points, as one PathCollection.
+
     Parameters:
         ax (Axis) : matplotlib Axis to which to add annotation.
 
@@ -59,18 +85,30 @@ def annotate_plot(self, ax=None):
 
     """
     ylim = ax.get_ylim()
-    for i, polygon in enumerate(self.polygons):
-
-        # alternating colors
-        (color:='red') if (i % 2)==0 else (color:='gray')
-
-        # for each polygon draw a rectangular patch along the x-axis
-        xmin, _, xmax, _ = polygon.bounds
-        patch = patches.Rectangle((xmin, ylim[0]), xmax-xmin, 0.05*(ylim[1]-ylim[0]), facecolor=color, alpha=0.5)
-        ax.add_patch(patch)
-
-        # add a text label at the polygon midpoint
-        ax.text((xmin + xmax)/2, ylim[0]+0.02*(ylim[1]-ylim[0]), i, color='black', fontsize=8, ha='center')
+    if len(self.polygons) == 0:
+        return ax
+
+    bounds = shapely.bounds(np.array(self.polygons, dtype=object))
+    xmin, xmax = bounds[:, 0], bounds[:, 2]
+    n = len(bounds)
+    y0, y1 = np.full(n, ylim[0]), np.full(n, ylim[0] + 0.05*(ylim[1]-ylim[0]))
+
+    # for each polygon a rectangular bar along the x-axis, in alternating colors
+    bars = np.stack([np.column_stack([xmin, y0]), np.column_stack([xmax, y0]), np.column_stack([xmax, y1]), np.column_stack([xmin, y1])], axis=1)
+    colors = np.where(np.arange(n) % 2 == 0, 'red', 'gray')
+    ax.add_collection(PolyCollection(bars, facecolors=colors, edgecolors='none', alpha=0.5), autolim=False)
+
+    # a label at each polygon midpoint, centered on it, with its size in points whatever the dpi
+    font = FontProperties(size=8)
+    labels = []
+    for i in range(n):
+        path = TextPath((0, 0), str(i), prop=font)
+        x = path.vertices[:, 0]
+        labels.append(Path(path.vertices - [(x.min() + x.max())/2, 0], path.codes))
+    offsets = np.column_stack([(xmin + xmax)/2, np.full(n, ylim[0]+0.02*(ylim[1]-ylim[0]))])
+    numbers = PathCollection(labels, offsets=offsets, offset_transform=ax.transData, facecolors='black', edgecolors='none')
+    numbers.set_transform(Affine2D().scale(1/72) + ax.figure.dpi_scale_trans)
+    ax.add_collection(numbers, autolim=False)
 
     return ax
 
@@ -97,3 +135,83 @@ def get_scale_factor(fig, ax, scale, axis='x'):
     scale_factor = initial_scale/scale
 
     return scale_factor
+
+
+def render_pages(pages, output, exaggeration=3, units='m', scale=None, dpi=300, styles=SECTION_STYLES):
+    """Draw many cross-sections, one page each, into a multipage PDF file or PNG files in a directory.
+
+    The pages are drawn without pyplot on a single Agg figure, so no window is opened whatever the configured backend.
+    The figure, axes and section lines are made once; for each page the lines are given the new data and only the
+    polygons, annotation and legend are redrawn. Each page is written as soon as it is drawn, so pages may be
+    generated lazily.
+
+    Parameters:
+        pages (iterable) : tuples of the name of a cross-section, a list of up to len(styles) Sections, a list of their labels,
+            and the Change between the first two Sections or None.
+        output (str) : path of the PDF file to write if it ends in .pdf, otherwise the directory in which to write a PNG file per page.
+        exaggeration (int) : vertical exaggeration of the plots.
+        units (str) : unit to show in axis labels.
+        scale (float) : horizontal scale in units per inch, None to keep the figure size.
+        dpi (int) : resolution of the PNG files.
+        styles (list) : matplotlib Line2D properties for each of the Sections on a page.
+
+    Returns:
+        filenames (list) : the PDF file, or the PNG files, written.
+
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    pdf = output.lower().endswith('.pdf')
+    if not pdf:
+        os.makedirs(output, exist_ok=True)
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    ax.set_aspect(exaggeration)
+    ax.set_xlabel('Distance ({0})'.format(units))
+    ax.set_ylabel('Elevation ({0}), {1}x exaggeration'.format(units, exaggeration))
+    lines = [ax.plot([], [], **style)[0] for style in styles]
+    size = fig.get_size_inches().copy()
+
+    filenames = []
+    with PdfPages(output) if pdf else contextlib.nullcontext() as document:
+        for name, sections, labels, change in pages:
+            # clear the artists of the last page, keeping the lines
+            for artist in list(ax.patches) + list(ax.texts) + list(ax.collections):
+                artist.remove()
+
+            for i, line in enumerate(lines):
+                if i < len(sections):
+                    line.set_data(sections[i].projection['d'].to_numpy(), sections[i].projection['z'].to_numpy())
+                    line.set_label(labels[i])
+                    line.set_visible(True)
+                else:
+                    line.set_visible(False)
+                    line.set_label('_hidden')
+            ax.relim(visible_only=True)
+            ax.autoscale_view()
+
+            if change is not None:
+                change.polygon_plot(ax=ax, fill_label='Fill', cut_label='Cut')
+                change.annotate_plot(ax=ax)
+            ax.legend(loc='best')
+            ax.set_title('Cross-section {0}'.format(name))
+
+            if scale is not None:
+                fig.set_size_inches(size)
+                fig.set_size_inches(size * get_scale_factor(fig, ax, scale))
+
+            with timing.stage('render'):
+                if pdf:
+                    document.savefig(fig)
+                else:
+                    filename = os.path.join(output, '-'.join([name] + [label.replace('-', '') for label in labels]) + '.png')
+                    fig.savefig(filename, dpi=dpi)
+                    filenames.append(filename)
+
+    if pdf:
+        filenames.append(output)
+    return filenames
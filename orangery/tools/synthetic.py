@@ -0,0 +1,147 @@
+'''Functions to generate synthetic repeat surveys of cross-sections'''
+
+from __future__ import annotations
+
+import os
+from typing import Union
+
+import numpy as np
+import pandas as pnd
+
+# format string and column names of the generated survey files
+COLUMNS = 'pxyzctr'
+NAMES = ['Point', 'X', 'Y', 'Z', 'Code', 'Timestamp', 'Comment']
+
+# descriptive codes that may be added to each point, see the default codebook
+EXTRA_CODES = ['GND', 'TRE', 'TW', 'WSE']
+
+
+def _ground(u: np.ndarray, roughness: np.ndarray) -> np.ndarray:
+    """Elevation of the channel bed of each section at fractional distances u across it."""
+    k = np.arange(1, roughness.shape[1] + 1)
+    bed = np.einsum('spk,sk->sp', np.sin(np.pi * u[..., None] * k), roughness)
+    return 100.0 - 3.0 * np.exp(-((u - 0.5) / 0.15) ** 2) + bed
+
+
+def _survey(
+    rng: np.random.Generator,
+    origins: np.ndarray,
+    azimuths: np.ndarray,
+    roughness: np.ndarray,
+    doubled: np.ndarray,
+    points: int,
+    width: float,
+    codes: float,
+    change: Union[None, tuple[float, int, float]],
+    start: str
+) -> pnd.DataFrame:
+    """Shoot every cross-section once, returning survey records in the column order of NAMES."""
+    sections = len(origins)
+    h = width / (points - 1)
+
+    # distances along each line, jittered but in order, then doubled back at the middle point of some sections
+    d = np.linspace(0.0, width, points) + rng.uniform(-0.25 * h, 0.25 * h, (sections, points))
+    d[:, 0], d[:, -1] = 0.0, width
+    mid = points // 2
+    d[doubled, mid] = d[doubled, mid - 1] - 0.25 * h
+    u = d / width
+
+    z = _ground(u, roughness)
+    if change is not None:
+        amplitude, crossings, phase = change
+        z += amplitude * np.cos(np.pi * crossings * u + phase)
+
+    o = rng.normal(0.0, 0.2, (sections, points))
+    cos, sin = np.cos(azimuths)[:, None], np.sin(azimuths)[:, None]
+    x = origins[:, 0:1] + d * cos - o * sin
+    y = origins[:, 1:2] + d * sin + o * cos
+
+    n = sections * points
+    # draw each extra code independently, then look the combinations up in a table of code strings
+    p = min(codes / len(EXTRA_CODES), 1.0)
+    drawn = rng.random((n, len(EXTRA_CODES))) < p
+    combination = drawn @ (1 << np.arange(len(EXTRA_CODES)))
+    table = np.array([' '.join(['XS'] + [t for i, t in enumerate(EXTRA_CODES) if c >> i & 1]) for c in range(1 << len(EXTRA_CODES))], dtype=object)
+    code = table[combination]
+    first = np.arange(sections) * points
+    code[first] = 'JST ' + code[first]
+    code[first + points - 1] = 'JEND ' + code[first + points - 1]
+
+    comment = np.full(n, None, dtype=object)
+    comment[first] = ['XS-{0}'.format(i + 1) for i in range(sections)]
+
+    records = pnd.DataFrame({
+        'Point': np.arange(1, n + 1),
+        'X': x.ravel().round(4),
+        'Y': y.ravel().round(4),
+        'Z': z.ravel().round(4),
+        'Code': code,
+        'Timestamp': np.datetime_as_string(np.datetime64(start, 's') + 30 * np.arange(n), unit='s'),
+        'Comment': comment,
+    })
+    return records
+
+
+def surveys(
+    sections: int = 10,
+    points: int = 50,
+    codes: float = 1.0,
+    crossings: int = 2,
+    doubleback: float = 0.0,
+    width: float = 100.0,
+    spacing: float = 20.0,
+    seed: Union[None, int] = 0
+) -> tuple[pnd.DataFrame, pnd.DataFrame]:
+    """Generate a pair of surveys that repeat the same cross-sections.
+
+    Each cross-section is a channel with a rough bed. In the final condition the bed is raised and lowered
+    along the section by a smooth wave, so that the two profiles cross a given number of times.
+
+    Parameters:
+        sections (int) : number of cross-sections.
+        points (int) : number of points in each cross-section.
+        codes (float) : mean number of descriptive codes added to each point, besides the view and control codes.
+        crossings (int) : number of times the profiles of each cross-section cross between the end points.
+        doubleback (float) : fraction of the cross-sections whose profiles double back on themselves, as at an undercut bank.
+        width (float) : length of each cross-section.
+        spacing (float) : distance between the cross-sections.
+        seed (int) : seed for the random number generator.
+
+    Returns:
+        survey1 (DataFrame) : the initial condition, with the columns in NAMES and the format string COLUMNS.
+        survey2 (DataFrame) : the final condition.
+
+    """
+    if points < 3:
+        raise ValueError('Cross-sections need at least 3 points')
+
+    rng = np.random.default_rng(seed)
+    origins = np.column_stack([np.full(sections, 1000.0), 1000.0 + spacing * np.arange(sections)])
+    azimuths = rng.uniform(-0.3, 0.3, sections)
+    roughness = rng.normal(0.0, 0.1, (sections, 8)) / np.arange(1, 9)
+    doubled = rng.random(sections) < doubleback
+
+    survey1 = _survey(rng, origins, azimuths, roughness, doubled, points, width, codes, None, '2004-10-15T12:00:00')
+    survey2 = _survey(rng, origins, azimuths, roughness, doubled, points, width, codes, (0.5, crossings, 0.0), '2010-03-31T12:00:00')
+    return survey1, survey2
+
+
+def write(dirname: str, **kwargs) -> tuple[str, str]:
+    """Generate a pair of surveys and write them to csv files.
+
+    Parameters:
+        dirname (str) : directory in which to write the files.
+        kwargs (dict) : keyword arguments passed to surveys.
+
+    Returns:
+        file1 (str) : path of the initial condition, survey-t0.csv.
+        file2 (str) : path of the final condition, survey-t1.csv.
+
+    """
+    os.makedirs(dirname, exist_ok=True)
+    filenames = []
+    for label, records in zip(('t0', 't1'), surveys(**kwargs)):
+        filename = os.path.join(dirname, 'survey-{0}.csv'.format(label))
+        records.to_csv(filename, index=False)
+        filenames.append(filename)
+    return filenames[0], filenames[1]
@@ -0,0 +1,192 @@
+'''Functions to record the wall time, call count and peak memory of the stages of a run'''
+
+from __future__ import annotations
+
+import time
+import functools
+import tracemalloc
+import contextlib
+import dataclasses
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, TypeVar, Union, cast
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+
+@dataclasses.dataclass
+class _Stage:
+    """Totals of the calls of one stage."""
+    calls: int = 0
+    seconds: float = 0.0
+    peak: int = 0
+
+
+@dataclasses.dataclass
+class _Recorder:
+    """The state of a recording."""
+    start: float
+    memory: bool
+    tracing: bool = False
+    stages: Dict[str, _Stage] = dataclasses.field(default_factory=dict)
+    # the traced bytes at the start, the peak so far and the peak of the run at the start of each open stage
+    frames: List[List[int]] = dataclasses.field(default_factory=list)
+    peak: int = 0
+
+
+# stage totals while recording is enabled, otherwise None
+_recorder: Optional[_Recorder] = None
+
+# tracemalloc.reset_peak arrived in Python 3.9
+_RESET_PEAK = hasattr(tracemalloc, 'reset_peak')
+
+
+def enable(memory: bool = False) -> None:
+    """Start recording stage timings, discarding any earlier record.
+
+    Parameters:
+        memory (bool) : also trace allocations with tracemalloc, to record the peak memory allocated within each stage.
+            Before Python 3.9 the peak of a stage that does not raise the peak of the run is taken from the memory traced as it ends.
+
+    """
+    global _recorder
+    _recorder = _Recorder(start=time.perf_counter(), memory=memory)
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _recorder.tracing = True
+
+
+def disable() -> Union[None, Dict[str, Any]]:
+    """Stop recording stage timings.
+
+    Returns:
+        result (dict) : the report of the recording, see report, or None if recording was not enabled.
+
+    """
+    global _recorder
+    result = report()
+    if _recorder is not None and _recorder.tracing:
+        tracemalloc.stop()
+    _recorder = None
+    return result
+
+
+def enabled() -> bool:
+    """Return True if stage timings are being recorded."""
+    return _recorder is not None
+
+
+def record(name: str, seconds: float, peak: int = 0) -> None:
+    """Add one call of a stage to the record.
+
+    Parameters:
+        name (str) : name of the stage.
+        seconds (float) : wall time of the call.
+        peak (int) : peak bytes allocated during the call, the largest over all calls is kept.
+
+    """
+    if _recorder is None:
+        return
+    totals = _recorder.stages.setdefault(name, _Stage())
+    totals.calls += 1
+    totals.seconds += seconds
+    totals.peak = max(totals.peak, peak)
+
+
+def _enter(recorder: _Recorder) -> List[int]:
+    current, peak = tracemalloc.get_traced_memory()
+    frames = recorder.frames
+    if _RESET_PEAK:
+        # tracemalloc keeps a single peak, so pass it to the enclosing stages before resetting it for this one
+        for frame in frames:
+            frame[1] = max(frame[1], peak)
+        recorder.peak = max(recorder.peak, peak)
+        tracemalloc.reset_peak()
+    frame = [current, current, peak]
+    frames.append(frame)
+    return frame
+
+
+def _exit(recorder: _Recorder, frame: List[int]) -> int:
+    current, peak = tracemalloc.get_traced_memory()
+    frames = recorder.frames
+    frames.pop()
+    if not _RESET_PEAK and peak <= frame[2]:
+        # without reset_peak the peak is that of the whole run, and only belongs to this stage if it rose within it
+        peak = max(frame[1], current)
+    for outer in frames:
+        outer[1] = max(outer[1], peak)
+    return max(frame[1], peak) - frame[0]
+
+
+@contextlib.contextmanager
+def _timer(recorder: _Recorder, name: str) -> Iterator[None]:
+    frame = _enter(recorder) if recorder.memory and tracemalloc.is_tracing() else None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        if _recorder is recorder:
+            record(name, seconds, _exit(recorder, frame) if frame is not None else 0)
+
+
+def stage(name: str) -> ContextManager[None]:
+    """Return a context manager that records the wall time of the block it encloses as one call of a stage.
+
+    Parameters:
+        name (str) : name of the stage.
+
+    Returns:
+        context (context manager) : a timer while recording is enabled, otherwise a context manager that does nothing.
+
+    """
+    if _recorder is None:
+        return contextlib.nullcontext()
+    return _timer(_recorder, name)
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Decorate a function so that each call to it is recorded as a call of a stage.
+
+    While recording is disabled the wrapper only checks a module global before calling the function.
+
+    Parameters:
+        name (str) : name of the stage.
+
+    Returns:
+        decorator (callable) : the decorator.
+
+    """
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _recorder is None:
+                return func(*args, **kwargs)
+            with _timer(_recorder, name):
+                return func(*args, **kwargs)
+        return cast(F, wrapper)
+    return decorator
+
+
+def report() -> Union[None, Dict[str, Any]]:
+    """Summarize the stage timings recorded so far.
+
+    Stages may be nested, for example parse runs within survey, so the stage times and peaks are inclusive and need not sum to the totals.
+
+    Returns:
+        result (dict) : the wall time since recording was enabled, and the calls and seconds of each stage in the order they were first called,
+            or None if recording is not enabled. When tracing memory the peak bytes allocated over the whole run and within each stage are added.
+
+    """
+    if _recorder is None:
+        return None
+    memory = _recorder.memory and tracemalloc.is_tracing()
+    stages: Dict[str, Dict[str, Any]] = {}
+    for name, totals in _recorder.stages.items():
+        stages[name] = {'calls': totals.calls, 'seconds': totals.seconds}
+        if memory:
+            stages[name]['peak_bytes'] = totals.peak
+    result: Dict[str, Any] = {'wall': time.perf_counter() - _recorder.start}
+    if memory:
+        result['peak_bytes'] = max([_recorder.peak, tracemalloc.get_traced_memory()[1]] + [frame[1] for frame in _recorder.frames])
+    result['stages'] = stages
+    return result
@@ -0,0 +1,41 @@
+import os
+
+import pandas as pnd
+
+import orangery as o
+from orangery.cli import defaults
+
+
+DATA = os.path.join(os.path.dirname(__file__), '..', 'examples', 'data')
+
+
+def _surveys():
+    s1 = o.Survey(os.path.join(DATA, 'file_2004.csv'), 'pxyzctr', defaults.codes, 0)
+    s2 = o.Survey(os.path.join(DATA, 'file_2010.csv'), 'pxyzctr', defaults.codes, 0)
+    return s1, s2
+
+
+def test_changes_jobs():
+    s1, s2 = _surveys()
+    names = o.shared_groups(s1, s2, pattern='XS-[1-4]')
+
+    serial = o.tabulate(o.changes(s1, s2, names, reverse='t0', close_ends=True))
+    parallel = o.tabulate(o.changes(s1, s2, names, reverse='t0', close_ends=True, jobs=2))
+
+    assert names == ['XS-1', 'XS-2', 'XS-4', 'XS-3']
+    assert list(serial['section'].unique()) == names
+    pnd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_changes_jobs_skip(caplog):
+    s1, s2 = _surveys()
+    names = ['XS-1', 'missing', 'XS-2']
+
+    serial = o.tabulate(o.changes(s1, s2, names, reverse='t0', close_ends=True))
+    parallel = o.tabulate(o.changes(s1, s2, names, reverse='t0', close_ends=True, jobs=2))
+
+    assert list(parallel['section'].unique()) == ['XS-1', 'XS-2']
+    pnd.testing.assert_frame_equal(serial, parallel)
+    skipped = [r.getMessage() for r in caplog.records if 'missing' in r.getMessage()]
+    assert len(skipped) == 2
+    assert all(message.startswith('Skipping cross-section missing: ') and message.endswith(')') for message in skipped)
@@ -1,10 +1,20 @@
-from pkg_resources import iter_entry_points
+import io
+import os
+import json
+import sys
+import time
+import shutil
+import subprocess
 
+import pandas as pnd
 from click.testing import CliRunner
 
 
 import orangery
 from orangery.cli.orangery import cli
+from orangery.cli import defaults
+import orangery.tools.memory as memory
+from orangery.tools.plotting import render_pages
 
 
 def test_orangery():
@@ -13,6 +23,53 @@ def test_orangery():
     assert result.exit_code == 0
 
 
+# seconds allowed for the fastest of several runs of orangery --help in a fresh interpreter, loose enough for loaded
+# machines; the check that no heavy module is imported is what catches eager imports
+STARTUP_BUDGET = 3.0
+
+STARTUP = '''
+import sys
+from orangery.cli.orangery import cli
+try:
+    cli(['--help'])
+except SystemExit:
+    pass
+heavy = [m for m in ('numpy', 'pandas', 'shapely', 'matplotlib', 'opusxml') if m in sys.modules]
+sys.stderr.write(' '.join(heavy))
+'''
+
+
+def test_startup():
+    timings = []
+    for i in range(3):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', STARTUP], capture_output=True, text=True)
+        timings.append(time.perf_counter() - start)
+        assert result.returncode == 0
+        assert 'geodetic' in result.stdout
+
+    assert result.stderr == ''
+    assert min(timings) < STARTUP_BUDGET
+
+
+def test_broken_subcommand(monkeypatch):
+    from importlib.metadata import EntryPoint
+    from orangery.cli import orangery as entry
+
+    eps = dict(entry.subcommands(), broken=EntryPoint('broken', 'orangery.cli.missing:broken', 'orangery.subcommands'))
+    monkeypatch.setattr(entry, 'subcommands', lambda: eps)
+    monkeypatch.setattr(cli, 'commands', dict(cli.commands))
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ['--help'])
+    assert result.exit_code == 0
+    assert 'could not load' in result.output
+
+    result = runner.invoke(cli, ['broken'])
+    assert result.exit_code == 1
+    assert 'ModuleNotFoundError' in result.output
+
+
 def test_adjust():
     runner = CliRunner()
     result = runner.invoke(cli, ['adjust', '--help'])
@@ -35,3 +92,154 @@ def test_segment():
     runner = CliRunner()
     result = runner.invoke(cli, ['segment', '--help'])
     assert result.exit_code == 0
+
+
+def test_cutfill_all():
+    data = os.path.join(os.path.dirname(__file__), '..', 'examples', 'data')
+    file1 = os.path.abspath(os.path.join(data, 'file_2004.csv'))
+    file2 = os.path.abspath(os.path.join(data, 'file_2010.csv'))
+
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        result = runner.invoke(cli, ['cutfill', file1, file2, 'pxyzctr', '--match', 'XS-1*', '--reverse', 't0', '--no-summary', '-o', 'reach.csv'])
+        assert result.exit_code == 0
+        table = pnd.read_csv('reach.csv')
+
+    assert list(table['section'].unique()) == ['XS-1', 'XS-10', 'XS-11', 'XS-12']
+    assert {'length', 'fill', 'cut', 'net', 'polygon', 'x0', 'x1', 'area'}.issubset(table.columns)
+
+
+def test_render(tmp_path):
+    data = os.path.join(os.path.dirname(__file__), '..', 'examples', 'data')
+    file1 = os.path.abspath(os.path.join(data, 'file_2004.csv'))
+    file2 = os.path.abspath(os.path.join(data, 'file_2010.csv'))
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ['cutfill', file1, file2, 'pxyzctr', '--match', 'XS-1*', '--reverse', 't0', '--no-summary', '-o', str(tmp_path / 'reach.csv'), '--render', str(tmp_path / 'reach.pdf')])
+    assert result.exit_code == 0
+    with open(tmp_path / 'reach.pdf', 'rb') as src:
+        assert src.read().count(b'/Type /Page /Parent') == 4
+
+    result = runner.invoke(cli, ['section', file1, 'pxyzctr', '--match', 'XS-1*', '--render', str(tmp_path / 'sections')])
+    assert result.exit_code == 0
+    assert sorted(os.listdir(tmp_path / 'sections')) == ['XS-1-20041015.png', 'XS-10-20041015.png', 'XS-11-20041015.png', 'XS-12-20041015.png']
+    assert 'Figures for 4 of 4 cross-sections' in result.output
+
+    result = runner.invoke(cli, ['section', file1, 'pxyzctr', '--match', 'XS-1*', '--exclude', 'XS', '--render', str(tmp_path / 'none.pdf')])
+    assert result.exit_code == 0
+    assert 'Figures for 0 of 4 cross-sections' in result.output
+
+    result = runner.invoke(cli, ['section', file1, 'pxyzctr', 'XS-1', '--render', str(tmp_path / 'one.pdf')])
+    assert result.exit_code == 2
+
+    s1 = orangery.Survey(file1, 'pxyzctr', defaults.codes, 0)
+    s2 = orangery.Survey(file2, 'pxyzctr', defaults.codes, 0)
+    (name, chg), = orangery.changes(s1, s2, ['XS-1'], reverse='t0', close_ends=True)
+    filenames = render_pages([(name, [chg.section1, chg.section2], ['t0', 't1'], chg)] * 3, str(tmp_path / 'pages.pdf'))
+    assert filenames == [str(tmp_path / 'pages.pdf')]
+    filenames = render_pages([(name, [chg.section1, chg.section2], ['t0', 't1'], chg)], str(tmp_path / 'pages'))
+    assert filenames == [str(tmp_path / 'pages' / 'XS-1-t0-t1.png')]
+
+
+def _stderr_runner() -> CliRunner:
+    # click 8.2 always captures stderr apart from stdout, earlier versions mix them unless told not to
+    try:
+        return CliRunner(mix_stderr=False)
+    except TypeError:
+        return CliRunner()
+
+
+def test_profile(tmp_path):
+    data = os.path.join(os.path.dirname(__file__), '..', 'examples', 'data')
+    file1 = os.path.abspath(os.path.join(data, 'file_2004.csv'))
+    file2 = os.path.abspath(os.path.join(data, 'file_2010.csv'))
+
+    runner = _stderr_runner()
+    result = runner.invoke(cli, ['--profile', 'cutfill', file1, file2, 'pxyzctr', '--match', 'XS-1*', '--no-summary', '-o', str(tmp_path / 'reach.csv')])
+    assert result.exit_code == 0
+
+    report = json.loads(result.stderr)
+    assert report['stages']['survey']['calls'] == 2
+    assert report['stages']['difference']['calls'] == 4
+    assert report['wall'] > 0
+
+    result = runner.invoke(cli, ['--memory-report', 'cutfill', file1, file2, 'pxyzctr', '--match', 'XS-1*', '--no-summary', '-o', str(tmp_path / 'reach.csv')])
+    assert result.exit_code == 0
+
+    report = json.loads(result.stderr)
+    stages, objects = report['stages'], report['objects']
+    assert all(stage['peak_bytes'] >= 0 for stage in stages.values())
+    assert stages['section']['peak_bytes'] > 0
+    assert stages['survey']['peak_bytes'] >= stages['parse']['peak_bytes'] > 0
+    assert report['peak_bytes'] >= max(stage['peak_bytes'] for stage in stages.values())
+
+    surveys = [orangery.Survey(filename, 'pxyzctr', defaults.codes, 0) for filename in (file1, file2)]
+    assert objects['Survey']['count'] == 2
+    assert objects['Survey']['bytes'] == {part: sum(s.memory_usage()[part] for s in surveys) for part in ('data', 'code_table', 'group_index')}
+    assert objects['Survey']['bytes']['data'] == sum(memory.frame_bytes(s.data) for s in surveys)
+
+    assert objects['Section']['count'] == 8
+    assert objects['Change']['count'] == 4
+    assert set(objects['Change']['bytes']) == {'intersections', 'polygons', 'cutfill'}
+    assert objects['Change']['bytes']['polygons'] > 0
+    for kind in ('Survey', 'Section', 'Change'):
+        assert objects[kind]['total_bytes'] == sum(objects[kind]['bytes'].values())
+        assert 0 < objects[kind]['max_bytes'] <= objects[kind]['total_bytes']
+
+
+def test_geodetic_batch(tmp_path):
+    gnss = str(tmp_path / 'gnss.csv')
+    with open(gnss, 'w') as dst:
+        dst.write('lat,lon,hae\n39.99277705,-76.26108657,230.92\n40.1,-76.3,120.5\n39.8,-76.1,310.0\n')
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ['geodetic', '--input', gnss, '--chunksize', '2', '-o', str(tmp_path / 'ecef.csv')])
+    assert result.exit_code == 0
+    ecef = pnd.read_csv(tmp_path / 'ecef.csv')
+
+    result = runner.invoke(cli, ['geodetic', '--input', '-', '--to', 'lla', '--method', 'direct'], input=ecef[['X', 'Y', 'Z']].to_csv(index=False))
+    assert result.exit_code == 0
+
+    assert list(ecef.columns) == ['lat', 'lon', 'hae', 'X', 'Y', 'Z']
+    assert len(ecef) == 3
+    lla = pnd.read_csv(io.StringIO(result.output))
+    pnd.testing.assert_frame_equal(lla[['lat', 'lon', 'hae']], ecef[['lat', 'lon', 'hae']], atol=1e-6)
+
+    result = runner.invoke(cli, ['geodetic', '--input', str(tmp_path / 'ecef.csv'), '-o', str(tmp_path / 'again.csv')])
+    assert result.exit_code == 2
+    assert 'columns named X, Y, Z' in result.output
+
+
+def test_adjust_batch(tmp_path, caplog):
+    examples = os.path.join(os.path.dirname(__file__), '..', 'examples')
+    survey = os.path.abspath(os.path.join(examples, 'data', 'Topo-20100331.csv'))
+    opus = os.path.abspath(os.path.join(examples, 'opus', '2010096o.10o.xml'))
+    codes = os.path.abspath(os.path.join(examples, 'json', 'codebook.json'))
+
+    copy = tmp_path / 'Topo-copy.csv'
+    shutil.copy(survey, copy)
+
+    manifest = tmp_path / 'manifest.csv'
+    manifest.write_text('survey,opus,point\n{0},{1},BASE2\n{2},{1},MISSING\n'.format(survey, opus, copy))
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ['adjust-batch', str(manifest), codes, 'pyxzctr', '-u', 'sft', '-d', str(tmp_path / 'out')])
+
+    assert result.exit_code == 1
+    assert 'skipped' in result.output
+    assert 'found 0 records of point MISSING' in caplog.text
+    original = pnd.read_csv(survey)
+    corrected = pnd.read_csv(tmp_path / 'out' / 'Topo-20100331-corr.csv')
+    base = corrected[corrected['Point'] == 'BASE2'].iloc[0]
+    assert abs(base['Easting'] - 2385660.30741) < 1e-6
+    assert abs(base['Northing'] - 243740.69362) < 1e-6
+    assert len(corrected) == len(original)
+
+    os.makedirs(tmp_path / 'other')
+    shutil.copy(survey, tmp_path / 'other' / 'Topo-20100331.csv')
+    clash = tmp_path / 'clash.csv'
+    clash.write_text('survey,opus,point\n{0},{1},BASE2\nother/Topo-20100331.csv,{1},BASE2\n'.format(survey, opus))
+    result = runner.invoke(cli, ['adjust-batch', str(clash), codes, 'pyxzctr', '-u', 'sft', '-d', str(tmp_path / 'clash')])
+    assert result.exit_code == 2
+    assert 'same output file' in result.output
+    assert not os.path.exists(tmp_path / 'clash')
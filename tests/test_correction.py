@@ -0,0 +1,39 @@
+import os
+
+import numpy as np
+
+import orangery as o
+import orangery.ops.correction as oc
+from orangery.cli import defaults
+
+
+DATA = os.path.join(os.path.dirname(__file__), '..', 'examples', 'data')
+
+
+def test_transforms():
+    xyz = np.array([[1.0, 0.0, 0.0], [2.0, 1.0, 5.0]])
+
+    np.testing.assert_allclose(oc.transform(xyz, oc.rotation(90)), [[0.0, 1.0, 0.0], [-1.0, 2.0, 5.0]], atol=1e-12)
+    np.testing.assert_allclose(oc.transform(xyz, oc.rotation(90, origin=(1.0, 1.0, 0.0))), [[2.0, 1.0, 0.0], [1.0, 2.0, 5.0]], atol=1e-12)
+    np.testing.assert_allclose(oc.transform(xyz, oc.scaling(2.0, origin=(1.0, 0.0, 0.0))), [[1.0, 0.0, 0.0], [3.0, 2.0, 10.0]])
+    np.testing.assert_allclose(oc.transform(xyz, oc.helmert(1.0, 2.0, 3.0)), xyz + [1.0, 2.0, 3.0])
+
+    # a small rotation about z in the position vector convention, and back again in the coordinate frame convention
+    forward = oc.helmert(rz=1.0, ds=10.0)
+    np.testing.assert_allclose(oc.transform(xyz, forward)[0], [1.00001, 1.00001 * oc.ARCSECOND, 0.0])
+    np.testing.assert_allclose(oc.transform(xyz, oc.compose(forward, oc.helmert(rz=1.0, ds=-10.0, convention='frame'))), xyz, atol=1e-9)
+
+
+def test_survey_apply_transforms():
+    s = o.Survey(os.path.join(DATA, 'file_2004.csv'), 'pxyzctr', defaults.codes, 0)
+    xyz = s.data[['x', 'y', 'z']].to_numpy()
+    transforms = [oc.translation(1.0, 2.0, 3.0), oc.rotation(30.0, origin=(243000.0, 2385000.0, 0.0)), oc.helmert(0.1, 0.2, 0.3, 1.0, 2.0, 3.0, 5.0)]
+
+    expected = xyz
+    for matrix in transforms:
+        s.queue_transform(matrix)
+        expected = oc.transform(expected, matrix)
+    s.apply_transforms()
+
+    np.testing.assert_allclose(s.data[['x', 'y', 'z']].to_numpy(), expected, rtol=0, atol=1e-8)
+    assert s.transforms == []
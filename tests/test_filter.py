@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pnd
+
+import orangery as o
+
+
+def test_group_exclude():
+    df = pnd.DataFrame({
+        'p': ['1', '2', '3', '4', '5'],
+        'c': pnd.Series(['JST XS', np.nan, 'XS TRE', 'XS TREE', 'JEND XS'], dtype=object),
+        'z': [1.0, 2.0, 3.0, 4.0, 5.0],
+    })
+    code_table = pnd.DataFrame({'group': ['XS-1', 'XS-1', 'XS-1', 'XS-1', None]})
+
+    result = o.group(df, code_table, 'XS-1', exclude=['TRE'])
+
+    assert result['p'].tolist() == ['1', '2', '4']
+    assert result.index.tolist() == [0, 1, 3]
+
+    result.loc[0, 'z'] = 0.0
+    assert df.loc[0, 'z'] == 1.0
+
+
+def test_group_unknown():
+    df = pnd.DataFrame({'p': ['1'], 'c': ['XS']})
+    code_table = pnd.DataFrame({'group': ['XS-1']})
+
+    assert o.group(df, code_table, 'XS-2').empty
+
+
+def test_excluded_categorical():
+    from orangery.core.filter import excluded
+    import orangery.ops.text as ot
+
+    codes = pnd.Series(['JST XS', np.nan, 'XS TRE', 'XS TREE', 'JEND XS', 'TRE', 'nan'], dtype=object)
+    lean = codes.astype('category')
+
+    for exclude in (['TRE'], ['XS', 'GND'], ['GND'], ['nan']):
+        expected = excluded(codes, exclude)
+        np.testing.assert_array_equal(excluded(lean, exclude), expected)
+        np.testing.assert_array_equal(excluded(lean.iloc[[2, 3, 5]], exclude), expected[[2, 3, 5]])
+
+    # the categories are tokenized once for all slices of the column
+    assert ot.category_tokens(lean.iloc[[0, 1]].dtype) is ot.category_tokens(lean.dtype)
@@ -0,0 +1,43 @@
+import numpy as np
+
+import orangery.ops.geodetic as ogd
+
+
+def _points(n=1000):
+    rng = np.random.default_rng(0)
+    lon = rng.uniform(-89.0, 89.0, n)
+    lat = rng.uniform(-80.0, 80.0, n)
+    h = rng.uniform(-100.0, 5000.0, n)
+    return lon, lat, h
+
+
+def test_array_conversions_match_scalar():
+    lon, lat, h = _points()
+
+    X, Y, Z = ogd.lla2ecef_array(np.radians(lon), np.radians(lat), h)
+    bowring = ogd.ecef2lla_bowring_array(X, Y, Z)
+    direct = ogd.ecef2lla_direct_array(X, Y, Z, ellipsoid=ogd.wgs84())
+
+    for i in range(0, len(lon), 97):
+        np.testing.assert_allclose((X[i], Y[i], Z[i]), ogd.lla2ecef(np.radians(lon[i]), np.radians(lat[i]), h[i]), rtol=0, atol=1e-8)
+        np.testing.assert_allclose([v[i] for v in bowring], ogd.ecef2lla_bowring(X[i], Y[i], Z[i]), rtol=0, atol=1e-7)
+        np.testing.assert_allclose([v[i] for v in direct], ogd.ecef2lla_direct(X[i], Y[i], Z[i]), rtol=0, atol=1e-7)
+
+    np.testing.assert_allclose(bowring[0], lon, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(bowring[1], lat, rtol=0, atol=1e-6)
+    np.testing.assert_allclose(bowring[2], h, rtol=0, atol=1e-4)
+
+
+def test_array_conversions_western_hemisphere():
+    X, Y, Z = ogd.lla2ecef_array(np.radians([170.0, -120.0]), np.radians([10.0, -20.0]), [10.0, 20.0])
+
+    lon, lat, h = ogd.ecef2lla_direct_array(X, Y, Z)
+
+    np.testing.assert_allclose(lon, [170.0, -120.0])
+    np.testing.assert_allclose(lat, [10.0, -20.0])
+    np.testing.assert_allclose(h, [10.0, 20.0], atol=1e-6)
+
+
+def test_ellipsoid_record():
+    assert ogd.as_ellipsoid(ogd.wgs84()) == ogd.WGS84
+    assert ogd.WGS84.b == ogd.wgs84()['b']
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pnd
+from shapely.geometry import Point, LineString, MultiLineString, MultiPoint, Polygon, box
+
+import orangery.ops.geometry as og
+
+
+def test_project_points_engines():
+    p1 = Point(0.0, 0.0, 0.0)
+    p2 = Point(10.0, 5.0, 0.0)
+    points = pnd.DataFrame({
+        'x': [-3.0, 0.0, 4.0, 12.0, 6.0],
+        'y': [1.0, 0.0, -2.0, 9.0, 3.0],
+        'z': [1.0, 2.0, 3.0, 4.0, 5.0],
+    })
+
+    vectorized = og.project_points(points, p1, p2, engine='numpy')
+    iterative = og.project_points(points, p1, p2, engine='shapely')
+
+    assert list(vectorized.columns) == ['x', 'y', 'z', 'd', 'o', 'u']
+    np.testing.assert_allclose(vectorized.to_numpy(), iterative.to_numpy())
+    assert vectorized['d'].iloc[0] < 0
+    assert np.sign(vectorized['o'].iloc[3]) != np.sign(vectorized['o'].iloc[2])
+
+
+def test_project_points_degenerate_line():
+    p1 = Point(1.0, 1.0, 0.0)
+    points = pnd.DataFrame({'x': [0.0], 'y': [0.0], 'z': [0.0]})
+
+    result = og.project_points(points, p1, p1)
+
+    assert result.empty
+    assert list(result.columns) == ['x', 'y', 'z', 'd', 'o', 'u']
+
+
+def test_difference_engines():
+    # two profiles crossing at d=1 and d=6
+    line1 = LineString([(0, 0), (4, 0), (10, 0)])
+    line2 = LineString([(0, -1), (3, 2), (5, 2), (7, -2), (10, -1)])
+
+    for close_ends in (False, True):
+        expected = og.difference(line1, line2, close_ends=close_ends)
+        result = og.difference(line1, line2, close_ends=close_ends, engine='numpy')
+
+        np.testing.assert_allclose(result[2].to_numpy(), expected[2].to_numpy())
+        np.testing.assert_allclose([p.area for p in result[1]], np.abs(result[2].to_numpy()))
+        assert result[0].equals(expected[0])
+
+    intersections, polygons, cutfill = og.difference(line1, line2, close_ends=True, engine='numpy')
+    np.testing.assert_allclose(cutfill.to_numpy(), [-0.5, 7.0, -5.5])
+
+
+def test_difference_numpy_doubled_back_line():
+    line1 = LineString([(0, 0), (6, 0), (5, 1), (10, 1)])
+    line2 = LineString([(0, 2), (10, -2)])
+
+    expected = og.difference(line1, line2, close_ends=True)
+    result = og.difference(line1, line2, close_ends=True, engine='numpy')
+
+    np.testing.assert_allclose(result[2].to_numpy(), expected[2].to_numpy())
+
+
+def test_signs_doubled_back_line():
+    # the line runs right, back left and right again between d=4 and d=6
+    line = LineString([(0, 0), (6, 0), (4, 0.2), (10, 0.2)])
+    polygons = [box(4.5, 0.5, 5.5, 1.0), box(4.5, -1.0, 5.5, -0.5), box(7.0, 0.5, 8.0, 1.0), Polygon()]
+
+    assert og.signs(polygons, line).tolist() == [1, -1, 1, 0]
+    assert og.signs(polygons[:3], line, blocksize=1).tolist() == [1, -1, 1]
+
+
+def test_cut_by_points():
+    line = LineString([(0, 0), (1, 0), (2, 0), (3, 0)])
+    # out of order, on and between vertices, duplicated, at an end and off the line
+    cuts = MultiPoint([(2.5, 0), (1, 0), (0.5, 0), (2.5, 0), (3, 0), (1, 1)])
+
+    segments = og.cut_by_points([line], cuts)
+
+    assert [list(s.coords) for s in segments.geoms] == [
+        [(0, 0), (0.5, 0)],
+        [(0.5, 0), (1, 0)],
+        [(1, 0), (2, 0), (2.5, 0)],
+        [(2.5, 0), (3, 0)],
+    ]
+
+
+def test_difference_close_ends_opposed():
+    # the final condition was shot in the opposite direction and is not reversed; the closing lines cut it out of order
+    line1 = LineString([(0, 0), (4, 0), (10, 0)])
+    line2 = LineString([(10.5, -1), (7, -2), (5, 2), (3, 2), (-0.5, -1)])
+
+    intersections, polygons, cutfill = og.difference(line1, line2, close_ends=True)
+    expected = og.difference(line1, LineString(line2.coords[::-1]), close_ends=True)[2]
+
+    assert len(cutfill) == 3
+    np.testing.assert_allclose(np.sort(cutfill), np.sort(expected))
+    np.testing.assert_allclose(np.sort(cutfill), [-40 / 7, -4 / 21, 22 / 3])
+
+
+def test_snap_to_points():
+    segments = MultiLineString([[(0, 0), (1.000000001, 0)], [(1, 1e-9), (2, 0), (3, 0)], [(3, 0.1), (4, 0)]])
+    intersections = [Point(1, 0), Point(3, 0), Point(10, 10)]
+
+    snapped = og.snap_to_points(segments, intersections)
+
+    assert [list(s.coords) for s in snapped.geoms] == [
+        [(0, 0), (1, 0)],
+        [(1, 0), (2, 0), (3, 0)],
+        [(3, 0.1), (4, 0)],
+    ]
+
+
+def test_difference_many():
+    line1 = LineString([(0, 0), (4, 0), (10, 0)])
+    line2 = LineString([(0, -1), (3, 2), (5, 2), (7, -2), (10, -1)])
+    flat = LineString([(0, 1), (10, 1)])
+
+    result = og.difference_many([line1, line1, flat], [line2, flat, line1], close_ends=True, names=['a', 'b', 'c'])
+
+    assert list(result.columns) == ['section', 'polygon', 'x0', 'x1', 'area']
+    assert result['section'].tolist() == ['a', 'a', 'a', 'b', 'c']
+    assert result['polygon'].tolist() == [0, 1, 2, 0, 0]
+    np.testing.assert_allclose(result['area'], [-0.5, 7.0, -5.5, 10.0, -10.0])
+    np.testing.assert_allclose(result[['x0', 'x1']].to_numpy()[:3], [[0, 1], [1, 6], [6, 10]])
+
+    open_ends = og.difference_many([line1], [line2])
+    np.testing.assert_allclose(open_ends['area'], [7.0])
+
+
+def test_difference_many_overhang():
+    # the ray from inside the lower polygon passes through a vertex where line1 turns back, or along a vertical segment
+    turned = LineString([(0, 0), (10, 0), (10, 10), (5, 10), (10, 12), (20, 12)])
+    vertical = LineString([(0, 0), (10, 0), (10, 10), (5, 10), (5, 12), (20, 12)])
+    flat = LineString([(0, 2), (20, 2)])
+
+    result = og.difference_many([turned, vertical], [flat, flat], close_ends=True)
+
+    np.testing.assert_allclose(result['area'], [20.0, -105.0, 20.0, -110.0])
+    for line1, (name, areas) in zip([turned, vertical], result.groupby('section')['area']):
+        intersections, polygons, signs = og.difference(line1, flat, close_ends=True)
+        np.testing.assert_allclose(areas, np.asarray(signs))
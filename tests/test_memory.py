@@ -0,0 +1,92 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from shapely.geometry import LineString
+
+import orangery as o
+import orangery.tools.memory as memory
+import orangery.tools.timing as timing
+from orangery.cli import defaults
+
+
+DATA = os.path.join(os.path.dirname(__file__), '..', 'examples', 'data')
+
+
+def test_geometry_bytes():
+    line = LineString([(0, 0), (1, 1), (2, 0)])
+    assert memory.geometry_bytes(line) == 48 + sys.getsizeof(line)
+    assert memory.geometry_bytes([line, None, line]) == 2 * memory.geometry_bytes(line)
+    assert memory.geometry_bytes([]) == 0
+
+
+def test_memory_usage():
+    memory.enable()
+    timing.enable(memory=True)
+    try:
+        s1 = o.Survey(os.path.join(DATA, 'file_2004.csv'), 'pxyzctr', defaults.codes, 0)
+        s2 = o.Survey(os.path.join(DATA, 'file_2010.csv'), 'pxyzctr', defaults.codes, 0)
+        pts1, pts2 = s1.group('XS-7'), s2.group('XS-7')
+        p1, p2 = o.endpoints(pts1, reverse=True)
+        chg = o.Change(o.Section(pts1, p1, p2, reverse=True), o.Section(pts2, p1, p2), close_ends=True)
+    finally:
+        stages = timing.disable()
+        objects = memory.disable()
+
+    assert not memory.enabled()
+    assert set(s1.memory_usage()) == {'data', 'code_table', 'group_index'}
+    assert s1.memory_usage()['data'] > s1.data[['x', 'y', 'z']].to_numpy().nbytes
+    assert chg.section1.memory_usage()['line'] > 8 * 2 * len(pts1)
+    assert chg.memory_usage()['polygons'] > 0
+
+    assert objects['Survey']['count'] == 2
+    assert objects['Section']['count'] == 2
+    assert objects['Change']['total_bytes'] == sum(chg.memory_usage().values())
+    assert objects['Survey']['max_bytes'] == max(sum(s.memory_usage().values()) for s in (s1, s2))
+
+    assert stages['stages']['survey']['peak_bytes'] >= stages['stages']['parse']['peak_bytes'] > 0
+    assert stages['peak_bytes'] >= stages['stages']['survey']['peak_bytes']
+
+
+def test_memory_open(tmp_path):
+    pytest.importorskip('pyarrow')
+    filename = str(tmp_path / 'survey.arrow')
+    o.Survey(os.path.join(DATA, 'file_2004.csv'), 'pxyzctr', defaults.codes, 0).save(filename, format='arrow')
+
+    memory.enable()
+    try:
+        opened = o.Survey.open(filename)
+    finally:
+        objects = memory.disable()
+
+    assert objects['Survey']['count'] == 1
+    assert objects['Survey']['total_bytes'] == sum(opened.memory_usage().values())
+
+
+def test_memory_untracked():
+    s = o.Survey(os.path.join(DATA, 'file_2004.csv'), 'pxyzctr', defaults.codes, 0)
+    assert memory.report() is None
+    assert np.all(np.array(list(s.memory_usage().values())) > 0)
+
+
+def test_stage_peaks(monkeypatch):
+    for reset in (True, False):
+        monkeypatch.setattr(timing, '_RESET_PEAK', reset and hasattr(timing.tracemalloc, 'reset_peak'))
+        timing.enable(memory=True)
+        try:
+            with timing.stage('outer'):
+                with timing.stage('large'):
+                    block = np.ones(1 << 20)
+                    del block
+                with timing.stage('small'):
+                    block = np.ones(1 << 10)
+                    del block
+        finally:
+            result = timing.disable()
+
+        stages = result['stages']
+        assert stages['large']['peak_bytes'] >= 8 << 20
+        assert stages['small']['peak_bytes'] < 1 << 20
+        assert stages['outer']['peak_bytes'] >= stages['large']['peak_bytes']
+        assert result['peak_bytes'] >= stages['outer']['peak_bytes']
@@ -0,0 +1,27 @@
+import matplotlib
+matplotlib.use('agg')
+from matplotlib.figure import Figure
+
+import orangery as o
+from orangery.cli import defaults
+from orangery.tools import synthetic
+
+
+def test_polygon_collections(tmp_path):
+    file1, file2 = synthetic.write(str(tmp_path), sections=1, points=400, crossings=60)
+    s1 = o.Survey(file1, synthetic.COLUMNS, defaults.codes)
+    s2 = o.Survey(file2, synthetic.COLUMNS, defaults.codes)
+    (name, chg), = o.changes(s1, s2, ['XS-1'], close_ends=True)
+    assert len(chg.polygons) == 61
+
+    ax = Figure().add_subplot(111)
+    chg.polygon_plot(ax=ax, fill_label='Fill', cut_label='Cut')
+    chg.annotate_plot(ax=ax)
+
+    assert len(ax.patches) == 0 and len(ax.texts) == 0
+    assert len(ax.collections) == 4
+    fill, cut = ax.collections[:2]
+    assert len(fill.get_paths()) == (chg.cutfill > 0).sum()
+    assert len(cut.get_paths()) == (chg.cutfill < 0).sum()
+    assert [t.get_text() for t in ax.legend().get_texts()] == ['Fill', 'Cut']
+    assert all(len(c.get_paths()) == 61 for c in ax.collections[2:])
@@ -0,0 +1,125 @@
+import os
+import shutil
+
+import pytest
+import pandas as pnd
+
+import orangery as o
+from orangery.cli import defaults
+
+
+DATA = os.path.join(os.path.dirname(__file__), '..', 'examples', 'data')
+
+
+def _survey(name='file_2004.csv'):
+    return o.Survey(os.path.join(DATA, name), 'pxyzctr', defaults.codes, 0)
+
+
+def test_survey_groups():
+    s = _survey()
+
+    names = s.groups()
+
+    assert names[0] == 'XS-1'
+    assert len(names) == len(set(names))
+    assert set(names) == set(s.code_table['group'].dropna())
+
+
+def test_survey_group_matches_filter():
+    s = _survey()
+
+    for name in s.groups():
+        expected = o.group(s.data, s.code_table, group=name, exclude=['TRE'])
+        assert s.group(name, exclude=['TRE']).equals(expected)
+
+    assert s.group('missing').empty
+
+
+def test_survey_cache(tmp_path):
+    pytest.importorskip('pyarrow')
+    cache = str(tmp_path / 'cache')
+    filename = str(tmp_path / 'survey.csv')
+    shutil.copy(os.path.join(DATA, 'file_2004.csv'), filename)
+
+    parsed = o.Survey(filename, 'pxyzctr', defaults.codes, 0, cache=cache)
+    assert len(os.listdir(cache)) == 1
+
+    cached = o.Survey(filename, 'pxyzctr', defaults.codes, 0, cache=cache)
+    pnd.testing.assert_frame_equal(cached.data, parsed.data)
+    pnd.testing.assert_frame_equal(cached.code_table, parsed.code_table)
+    assert cached.format == parsed.format
+    assert cached.groups() == parsed.groups()
+
+    # changing the file contents or the codebook invalidates the cache
+    with open(filename, 'a') as dst:
+        dst.write('9999,243372.3,2385646.2,324.1,XS,2004-10-15T13:00:00,\n')
+    o.Survey(filename, 'pxyzctr', defaults.codes, 0, cache=cache)
+    assert len(os.listdir(cache)) == 2
+
+    codes = dict(defaults.codes, group={'column': 'p'})
+    o.Survey(filename, 'pxyzctr', codes, 0, cache=cache)
+    assert len(os.listdir(cache)) == 3
+
+
+def test_survey_save_open(tmp_path):
+    pytest.importorskip('pyarrow')
+    filename = str(tmp_path / 'survey.arrow')
+    s = _survey()
+
+    s.save(filename, format='arrow')
+    opened = o.Survey.open(filename)
+
+    pnd.testing.assert_frame_equal(opened.data, s.data)
+    pnd.testing.assert_frame_equal(opened.code_table, s.code_table)
+    assert opened.format == s.format
+    assert opened.codebook == s.codebook
+    assert not opened.data['x'].to_numpy().flags.writeable
+    for name in s.groups():
+        assert opened.group(name).equals(s.group(name))
+
+    with pytest.raises(ValueError, match='filename'):
+        s.save(format='arrow')
+
+
+def test_survey_iter_groups():
+    filename = os.path.join(DATA, 'file_2004.csv')
+    s = _survey()
+
+    for chunksize in (1, 25, 100000):
+        streamed = list(o.Survey.iter_groups(filename, 'pxyzctr', defaults.codes, chunksize=chunksize, exclude=['TRE']))
+
+        assert [name for name, _ in streamed] == s.groups()
+        for name, records in streamed:
+            expected = s.group(name, exclude=['TRE'])
+            assert records.index.tolist() == expected.index.tolist()
+            assert records['z'].tolist() == expected['z'].tolist()
+
+
+def test_survey_lean():
+    s = _survey()
+    lean = o.Survey(os.path.join(DATA, 'file_2004.csv'), 'pxyzctr', defaults.codes, 0, lean=True)
+
+    assert isinstance(lean.data['c'].dtype, pnd.CategoricalDtype)
+    assert isinstance(lean.data['r'].dtype, pnd.CategoricalDtype)
+    assert pnd.api.types.is_datetime64_any_dtype(lean.data['t'])
+    assert lean.ingest_report['saved_bytes'] > 0
+    assert lean.ingest_report['bytes'] < s.data.memory_usage(deep=True).sum()
+
+    assert lean.groups() == s.groups()
+    for name in s.groups():
+        records = lean.group(name, exclude=['TRE'])
+        expected = s.group(name, exclude=['TRE'])
+        assert records.index.tolist() == expected.index.tolist()
+        assert records['z'].tolist() == expected['z'].tolist()
+
+
+def test_survey_lean_cached(tmp_path):
+    pytest.importorskip('pyarrow')
+    filename = os.path.join(DATA, 'file_2004.csv')
+    cache = str(tmp_path / 'cache')
+
+    cold = o.Survey(filename, 'pxyzctr', defaults.codes, 0, cache=cache, lean=True)
+    warm = o.Survey(filename, 'pxyzctr', defaults.codes, 0, cache=cache, lean=True)
+
+    assert cold.ingest_report['saved_bytes'] > 0
+    assert warm.ingest_report == cold.ingest_report
@@ -0,0 +1,36 @@
+import orangery as o
+import orangery.ops.geometry as og
+from orangery.cli import defaults
+from orangery.tools import synthetic
+
+
+def test_surveys(tmp_path):
+    file1, file2 = synthetic.write(str(tmp_path), sections=6, points=30, codes=2.0, crossings=3, doubleback=0.5, seed=1)
+    s1 = o.Survey(file1, synthetic.COLUMNS, defaults.codes)
+    s2 = o.Survey(file2, synthetic.COLUMNS, defaults.codes)
+
+    names = o.shared_groups(s1, s2)
+    assert names == ['XS-{0}'.format(i) for i in range(1, 7)]
+    assert len(s1.data) == 6 * 30
+    assert abs(s1.data['c'].str.count(' ').mean() - 2.0) < 0.5
+
+    # GEOS versions may split the polygons of doubled-back sections differently, so only their areas are compared
+    doubled = 0
+    numpy_changes = dict(o.changes(s1, s2, names, close_ends=True, engine='numpy'))
+    for name, chg in o.changes(s1, s2, names, close_ends=True):
+        summary, expected = chg.summary(), numpy_changes[name].summary()
+        for key in ('fill', 'cut', 'net'):
+            assert abs(summary[key] - expected[key]) < 1e-6
+        assert summary['fill'] > 0 > summary['cut']
+        if og.monotonic(chg.section1.projection[['d', 'z']].to_numpy()) is None:
+            doubled += 1
+        else:
+            assert len(chg.polygons) == 4
+    assert 0 < doubled < 6
+
+
+def test_surveys_seed():
+    first = synthetic.surveys(sections=2, points=5, seed=7)
+    second = synthetic.surveys(sections=2, points=5, seed=7)
+    assert all(a.equals(b) for a, b in zip(first, second))
+    assert list(first[0].columns) == synthetic.NAMES
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pnd
+
+import orangery.ops.text as ot
+from orangery.cli import defaults
+
+
+def _points(codes, remarks):
+    return pnd.DataFrame({
+        'p': ['P{0}'.format(i) for i in range(len(codes))],
+        'c': pnd.Series(codes, dtype=object),
+        'r': pnd.Series(remarks, dtype=object),
+    })
+
+
+def _values(column):
+    return [None if pnd.isna(v) else v for v in column]
+
+
+def test_parse_chains():
+    points = _points(
+        ['BASE', 'JST XS GND', 'XS TW', np.nan, 'JEND XS GND', 'BM', 'JST XS JEND'],
+        [None, 'XS-1', None, None, None, None, 'XS-2'],
+    )
+
+    code_table = ot.parse(points, defaults.codes)
+
+    assert list(code_table.columns) == ['marker', 'control', 'view', 'breakline', 'group']
+    assert _values(code_table['group']) == [None, 'XS-1', 'XS-1', 'XS-1', 'XS-1', None, 'XS-2']
+    assert _values(code_table['marker']) == ['BASE', None, None, None, None, 'BM', None]
+    assert _values(code_table['control']) == [None, 'JST', None, None, 'JEND', None, 'JEND']
+    assert _values(code_table['breakline']) == [None, None, 'TW', None, None, None, None]
+
+
+def test_parse_out_of_order_start():
+    points = _points(['JST XS', 'XS', 'JST XS', 'JEND XS'], ['XS-1', None, 'XS-2', None])
+
+    code_table = ot.parse(points, defaults.codes)
+
+    assert len(code_table) == 2
+    assert _values(code_table['group']) == ['XS-1', 'XS-1']
+
+
+def test_parse_out_of_order_end():
+    points = _points(['XS', 'JEND XS', 'XS'], [None, None, None])
+
+    code_table = ot.parse(points, defaults.codes)
+
+    assert len(code_table) == 2
+    assert _values(code_table['control']) == [None, 'JEND']
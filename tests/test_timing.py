@@ -0,0 +1,35 @@
+import os
+
+import orangery as o
+import orangery.tools.timing as timing
+from orangery.cli import defaults
+
+
+DATA = os.path.join(os.path.dirname(__file__), '..', 'examples', 'data')
+
+
+def test_timing():
+    @timing.timed('square')
+    def square(x):
+        return x * x
+
+    assert square(3) == 9
+    assert timing.report() is None
+
+    timing.enable()
+    try:
+        square(2)
+        square(4)
+        with timing.stage('block'):
+            pass
+        s = o.Survey(os.path.join(DATA, 'file_2004.csv'), 'pxyzctr', defaults.codes, 0)
+        s.group('XS-1')
+    finally:
+        result = timing.disable()
+
+    assert not timing.enabled()
+    assert result['stages']['square']['calls'] == 2
+    assert result['stages']['block']['calls'] == 1
+    assert {'survey', 'survey.read', 'parse', 'group'}.issubset(result['stages'])
+    assert result['stages']['survey']['seconds'] >= result['stages']['parse']['seconds']
+    assert result['wall'] >= result['stages']['survey']['seconds']